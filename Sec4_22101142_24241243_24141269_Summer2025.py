@@ -1,10 +1,23 @@
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
+import array
+import bisect
+import heapq
+import json
 import math
+import os
+import sys
+import threading
 import time
+import tracemalloc
 import random
 
+try:
+    from gymnasium import spaces
+except ImportError:
+    spaces = None
+
 # ===== HIGHWAY DASH 3D - Fixed Game Configuration =====
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
@@ -18,68 +31,537 @@ GAME_COMPLETE = 5
 CUSTOM_RACE_MENU = 6
 
 # Global variables
-game_state = MENU
-race_start_time = 0
 last_time = time.time()
 
-# Night mode only
-is_night_mode = False
-
-# Custom race settings
-custom_laps = 1
-custom_difficulty = 1  # 1=Easy, 2=Medium, 3=Hard
-
 # Game features
-coins_collected = 0
-current_level = 1
 max_level = 5
-first_person_view = False
-races_won = 0
-current_lap = 1
-total_laps = 1
 
 # Track Configuration
 ROAD_WIDTH = 400
-ROAD_LENGTH = 3000 + (current_level * 2000)
-FINISH_LINE_POSITION = ROAD_LENGTH - 200
+
+# Track geometry (curved centreline baked into an arc-length table)
+TRACK_SAMPLE_SPACING = 10      # Arc length between baked centreline samples
+TRACK_SPLINE_STEPS = 32        # Spline samples per control segment before resampling
+TRACK_CONTROL_SPACING = 1000
+TRACK_CURVE_AMPLITUDE = 60     # Sideways swing added per level after level 1
+TRACK_RENDER_TOLERANCE = 0.02  # Direction change before the road gets a new render segment (~3 units off at the road edge)
 
 # Physics Constants
 FRICTION = 0.95
 AIR_RESISTANCE = 0.98
 MAX_SPEED_LIMIT = 40
+CAR_COLLISION_DISTANCE = 40
+COIN_PICKUP_DISTANCE = 30
+COIN_SEARCH_DISTANCE = 100    # Track distance around the player checked for pickups each step
+
+# Physics stepping
+PHYSICS_TICK_RATE = 0             # Fixed physics ticks per second, 0 = one tick per frame
+ADAPTIVE_SUBSTEPPING = True       # Split fast ticks into substeps
+PHYSICS_SUBSTEP_DISTANCE = 20     # Max relative travel per substep before splitting
+MAX_PHYSICS_SUBSTEPS = 8
+
+# AI lane planner
+AI_PLAN_LANES = [-ROAD_WIDTH/3, -ROAD_WIDTH/6, 0, ROAD_WIDTH/6, ROAD_WIDTH/3]  # Candidate lateral offsets
+AI_PLAN_HORIZON_SECONDS = 1.0
+AI_PLAN_STEPS = 4                 # Prediction samples across the horizon
+AI_PLAN_BIN_LENGTH = 200          # Track distance covered by one occupancy bucket
+AI_PLAN_MAX_NEIGHBORS = 6         # Closest cars one plan looks at
+AI_PLAN_TICK_BUDGET = 600         # Lane evaluation work shared by all AI cars per tick
+AI_LANE_CHANGE_SECONDS = 0.5      # Assumed time to move across to a new lane
+AI_COLLISION_COST = 10.0
+AI_COIN_BONUS = 1.0
+AI_LANE_CHANGE_COST = 0.005       # Per unit of lateral distance, keeps lanes from flickering
+AI_LANE_GAIN = 0.01               # Sideways push per unit of distance from the target lane
+AI_LANE_DAMPING = 0.1             # Cancels this share of the sideways velocity each tick
+AI_MAX_STEER = 0.6
+
+# Race host (many headless sessions in one process)
+HOST_TICK_RATE = 30               # Simulation ticks per second for hosted sessions
+HOST_SESSION_TICK_BUDGET = 4      # Max ticks one session may run per round before yielding
+HOST_MAX_BACKLOG_SECONDS = 1.0    # Simulation time a lagging session may owe before it is dropped
+HOST_BENCHMARK_SESSIONS = 200
+HOST_BENCHMARK_SECONDS = 5.0
 
 # Camera settings
 camera_distance = 200
 camera_height = 100
 
-# Coin positions on road
-coin_positions = []
+# Night mode headlights (fixed-function GL has 8 lights, GL_LIGHT0 stays the sun/moon)
+HEADLIGHT_MAX_LIGHTS = 7
+HEADLIGHT_RANGE_AHEAD = 1500      # Track distance ahead of the player searched for lit cars
+HEADLIGHT_RANGE_BEHIND = 300      # And behind, for the chase camera
+HEADLIGHT_FORWARD_OFFSET = 20     # Light sits at the car's nose
+HEADLIGHT_CUTOFF_DEGREES = 35
+HEADLIGHT_EXPONENT = 8
+HEADLIGHT_LINEAR_ATTENUATION = 0.002
+HEADLIGHT_COLOR = [1.0, 0.95, 0.8, 1]
+DAY_LIGHT_COLOR = [1, 1, 1, 1]
+NIGHT_LIGHT_COLOR = [0.3, 0.3, 0.4, 1]  # Dim moonlight so the headlights show
+
+# Lit night surfaces: lighting is per vertex, so road and grass near the player are tessellated finely
+LIT_CHUNK_LENGTH = 500            # Track distance per cached surface chunk
+LIT_SEGMENT_LENGTH = 40           # Vertex spacing along the track in chunks near the player
+LIT_COARSE_SEGMENT_LENGTH = 100   # And in chunks out of headlight range
+LIT_ROAD_STEPS = 8                # Lateral subdivisions across the road
+LIT_GRASS_STEPS = 4               # And across each grass verge
+
+# Minimap (rendered offscreen at a low rate, composited over the HUD every frame)
+MINIMAP_UPDATE_HZ = 10
+MINIMAP_WIDTH = 120
+MINIMAP_HEIGHT = 240
+MINIMAP_MARGIN = 20               # Gap to the bottom right corner of the window
+MINIMAP_MARKER_SIZE = 5
+MINIMAP_COIN_COLOR = (0.9, 0.7, 0.1)
+
+# Roadside scenery as (lateral offset, distance along track)
+TREE_POSITIONS = [
+    (-250, 300), (280, 500), (-300, 800), (320, 1200),
+    (-280, 1600), (300, 2000), (-320, 2400), (290, 2800)
+]
+
+# Shared meshes for instanced drawing: mesh name -> (packed vertices, packed normals, vertex count)
+# of a GL_TRIANGLES list in model space
+mesh_templates = {}
 
 # Auto restart settings
 AUTO_RESTART_SECONDS = 3.0
-game_complete_time = None
 
-def generate_collectibles():
-    """Generate coins on the road"""
-    global coin_positions
-    coin_positions = []
-    
-    y_pos = 200
-    while y_pos < ROAD_LENGTH - 500:
-        x_pos = random.uniform(-ROAD_WIDTH/3, ROAD_WIDTH/3)
-        coin_positions.append([x_pos, y_pos, 10, True])
-        y_pos += random.uniform(200, 500)
+# Frame pacing
+TARGET_RACING_FPS = 60
+STATIC_SCREEN_POLL_SECONDS = 1 / 30  # How long idle() sleeps when nothing needs drawing
+SLEEP_SPIN_MARGIN = 0.002            # Busy-wait the last few ms for an accurate frame deadline
+CPU_REPORT_INTERVAL = 10.0
+
+# Input latency (key event to the first swapped frame that reflects it)
+INPUT_LATENCY_TARGET_MS = 50
+INPUT_LATENCY_BUCKETS_MS = [8, 16, 25, 33, 50, 75, 100]  # Histogram upper edges, the last bucket is open
+
+# Level preparation (built in the background while result screens are showing)
+LEVEL_PREPARE_WAIT_SECONDS = 0.05  # Race start waits this long for a busy worker before building itself
+RACE_START_TARGET_MS = 100         # Start key to first racing frame
+
+# Allocation profiling (--alloc-profile) and the headless memory soak test (--soak-test)
+ALLOC_REPORT_FRAMES = 600          # Frames between allocation reports
+SOAK_TEST_FRAMES = 5000
+SOAK_WARMUP_FRAMES = 300           # Caches and free lists settle before the baseline is taken
+SOAK_MEMORY_BUDGET_KB = 256        # Max traced Python memory growth over the soak
+SOAK_RSS_BUDGET_KB = 8192          # Max process RSS growth, which also covers native allocations
+SOAK_NIGHT_TOGGLE_FRAMES = 600     # Night mode flips this often, so lit surface chunks are built and reused
+
+# Render benchmark (--benchmark): fixed level/seed, scripted flythrough segments
+BENCHMARK_LEVEL = 3
+BENCHMARK_SEED = 2025
+BENCHMARK_FRAMES_PER_SEGMENT = 300
+BENCHMARK_SEGMENTS = [
+    # (name, first person view, night mode)
+    ("chase_day", False, False),
+    ("first_person_day", True, False),
+    ("chase_night", False, True),
+    ("first_person_night", True, True)
+]
+
+# Training environment (headless races for AI drivers)
+CARS_PER_RACE = 4
+ENV_DT = 1 / 60
+ENV_MAX_STEPS = 3000
+ENV_COINS_AHEAD = 3
+ENV_OBSERVATION_SIZE = 4 + 4 * (CARS_PER_RACE - 1) + 2 * ENV_COINS_AHEAD
+ENV_PROGRESS_REWARD = 0.01   # Per unit of distance gained along the track
+ENV_COIN_REWARD = 1.0
+ENV_CRASH_REWARD = -10.0
+ENV_FINISH_REWARD = 5.0
+ENV_WIN_REWARD = 10.0
+ENV_BENCHMARK_ENVS = 64
+ENV_BENCHMARK_STEPS = 500
+
+STATE_NAMES = {
+    MENU: "Menu", RACING: "Racing", PAUSED: "Paused", FINISHED: "Finished",
+    GAME_COMPLETE: "Game Complete", CUSTOM_RACE_MENU: "Custom Race Menu"
+}
+
+def swept_circle_hit(ax0, ay0, ax1, ay1, bx0, by0, bx1, by1, radius):
+    """True if two points moving linearly over the same step come within radius of each other"""
+    # Work in B's frame: A moves from p to p + d
+    px = ax0 - bx0
+    py = ay0 - by0
+    dx = (ax1 - ax0) - (bx1 - bx0)
+    dy = (ay1 - ay0) - (by1 - by0)
+    
+    # Closest approach along the step, clamped to [0, 1]
+    motion = dx * dx + dy * dy
+    t = 0.0
+    if motion > 0:
+        t = max(0.0, min(1.0, -(px * dx + py * dy) / motion))
+    closest_x = px + dx * t
+    closest_y = py + dy * t
+    return closest_x * closest_x + closest_y * closest_y < radius * radius
 
 def detect_car_collision(car1, car2):
-    """Detect collision between two cars"""
-    dx = car1.x - car2.x
-    dy = car1.y - car2.y
-    distance = math.sqrt(dx**2 + dy**2)
-    collision_distance = 40
-    return distance < collision_distance
+    """Detect collision between two cars anywhere along their last step"""
+    return swept_circle_hit(car1.prev_x, car1.prev_y, car1.x, car1.y,
+                            car2.prev_x, car2.prev_y, car2.x, car2.y,
+                            CAR_COLLISION_DISTANCE)
+
+class Track:
+    """Spline centreline baked into an arc-length lookup table with one sample every `spacing` units"""
+    
+    def __init__(self, control_points, spacing=TRACK_SAMPLE_SPACING):
+        # Densely sample the spline and accumulate chord lengths
+        dense = sample_catmull_rom(control_points, TRACK_SPLINE_STEPS)
+        cumulative = [0.0]
+        for (x0, y0), (x1, y1) in zip(dense, dense[1:]):
+            cumulative.append(cumulative[-1] + math.hypot(x1 - x0, y1 - y0))
+        
+        # Resample at even arc length so distance -> segment is a single division
+        self.spacing = spacing
+        sample_count = int(cumulative[-1] // spacing) + 1
+        self.length = (sample_count - 1) * spacing
+        self.points = []
+        for k in range(sample_count):
+            s = k * spacing
+            i = min(bisect.bisect_right(cumulative, s) - 1, len(dense) - 2)
+            span = cumulative[i + 1] - cumulative[i]
+            t = (s - cumulative[i]) / span if span > 0 else 0.0
+            self.points.append((dense[i][0] + (dense[i + 1][0] - dense[i][0]) * t,
+                                dense[i][1] + (dense[i + 1][1] - dense[i][1]) * t))
+        
+        # Unit forward vector and length of each segment
+        self.tangents = []
+        self.segment_lengths = []
+        for (x0, y0), (x1, y1) in zip(self.points, self.points[1:]):
+            length = math.hypot(x1 - x0, y1 - y0) or 1.0
+            self.tangents.append(((x1 - x0) / length, (y1 - y0) / length))
+            self.segment_lengths.append(length)
+        
+        # Samples where the direction changes; straight runs collapse into one render segment
+        self.render_indices = [0]
+        for i in range(1, len(self.tangents)):
+            last_x, last_y = self.tangents[self.render_indices[-1]]
+            x, y = self.tangents[i]
+            if abs(last_x * y - last_y * x) > TRACK_RENDER_TOLERANCE:
+                self.render_indices.append(i)
+        self.render_indices.append(len(self.points) - 1)
+        
+        # Static road geometry, packed into vertex arrays once per track
+        self.geometry = {}
+    
+    def segment_at(self, s):
+        """Segment index containing arc length s (O(1))"""
+        return max(0, min(int(s // self.spacing), len(self.tangents) - 1))
+    
+    def point_at(self, s, lateral=0.0):
+        """World (x, y) at arc length s and lateral offset (positive = right of centreline)"""
+        i = self.segment_at(s)
+        forward_x, forward_y = self.tangents[i]
+        along = (s - i * self.spacing) * self.segment_lengths[i] / self.spacing
+        x, y = self.points[i]
+        return (x + forward_x * along + forward_y * lateral,
+                y + forward_y * along - forward_x * lateral)
+    
+    def nearest_segment(self, x, y):
+        """Cold-start search over every sample, only used when there is no segment hint"""
+        return min(range(len(self.tangents)),
+                   key=lambda i: (self.points[i][0] - x)**2 + (self.points[i][1] - y)**2)
+    
+    def project(self, x, y, segment=None):
+        """Project a world point to (distance along, lateral offset, segment)
+        
+        Walks from the previous frame's segment, so a moving car costs O(1) amortized.
+        """
+        if segment is None:
+            segment = self.nearest_segment(x, y)
+        
+        i = segment
+        last = len(self.tangents) - 1
+        direction = 0
+        while True:
+            ax, ay = self.points[i]
+            forward_x, forward_y = self.tangents[i]
+            along = (x - ax) * forward_x + (y - ay) * forward_y
+            if along > self.segment_lengths[i] and i < last and direction >= 0:
+                i += 1
+                direction = 1
+            elif along < 0 and i > 0 and direction <= 0:
+                i -= 1
+                direction = -1
+            else:
+                break
+        
+        s = i * self.spacing + along * self.spacing / self.segment_lengths[i]
+        lateral = (x - ax) * forward_y - (y - ay) * forward_x
+        return s, lateral, i
+    
+    def heading_at(self, segment):
+        """Rotation in degrees (glRotatef about z) that points a +y model along the segment"""
+        forward_x, forward_y = self.tangents[segment]
+        return math.degrees(math.atan2(-forward_x, forward_y))
+    
+    def vertex_at(self, s, lateral, z):
+        x, y = self.point_at(s, lateral)
+        return (x, y, z)
+    
+    def strip(self, lateral_a, lateral_b, z):
+        """GL_QUADS vertex array (packed vertices, count) covering the whole track between two lateral offsets"""
+        key = ('strip', lateral_a, lateral_b, z)
+        if key not in self.geometry:
+            vertices = []
+            for a, b in zip(self.render_indices, self.render_indices[1:]):
+                s_a = a * self.spacing
+                s_b = b * self.spacing
+                vertices += [self.vertex_at(s_a, lateral_a, z), self.vertex_at(s_a, lateral_b, z),
+                             self.vertex_at(s_b, lateral_b, z), self.vertex_at(s_b, lateral_a, z)]
+            self.geometry[key] = (pack_vertices(vertices), len(vertices))
+        return self.geometry[key]
+    
+    def grid(self, lateral_a, lateral_b, z, s_start, s_end, segment_length, lateral_steps):
+        """GL_QUADS vertex array over one stretch at a fixed segment length with lateral subdivisions (for lit surfaces)
+        
+        Unlike strip(), straight runs are not collapsed, so per-vertex lighting has vertices to light.
+        """
+        key = ('grid', lateral_a, lateral_b, z, s_start, s_end, segment_length, lateral_steps)
+        if key not in self.geometry:
+            laterals = [lateral_a + (lateral_b - lateral_a) * i / lateral_steps for i in range(lateral_steps + 1)]
+            vertices = []
+            s = s_start
+            while s < s_end:
+                s_next = min(s + segment_length, s_end)
+                for a, b in zip(laterals, laterals[1:]):
+                    vertices += [self.vertex_at(s, a, z), self.vertex_at(s, b, z),
+                                 self.vertex_at(s_next, b, z), self.vertex_at(s_next, a, z)]
+                s = s_next
+            self.geometry[key] = (pack_vertices(vertices), len(vertices))
+        return self.geometry[key]
+    
+    def line(self, lateral, z, dash_length=None, gap_length=0):
+        """GL_LINES vertex array following the track at a lateral offset, optionally dashed"""
+        key = ('line', lateral, z, dash_length, gap_length)
+        if key not in self.geometry:
+            vertices = []
+            if dash_length is None:
+                for a, b in zip(self.render_indices, self.render_indices[1:]):
+                    vertices += [self.vertex_at(a * self.spacing, lateral, z),
+                                 self.vertex_at(b * self.spacing, lateral, z)]
+            else:
+                s = 0
+                while s < self.length:
+                    vertices += [self.vertex_at(s, lateral, z),
+                                 self.vertex_at(min(s + dash_length, self.length), lateral, z)]
+                    s += dash_length + gap_length
+            self.geometry[key] = (pack_vertices(vertices), len(vertices))
+        return self.geometry[key]
+
+def sample_catmull_rom(control_points, steps):
+    """Sample a Catmull-Rom spline through the control points"""
+    padded = [control_points[0]] + list(control_points) + [control_points[-1]]
+    samples = []
+    for k in range(1, len(padded) - 2):
+        p0, p1, p2, p3 = padded[k - 1], padded[k], padded[k + 1], padded[k + 2]
+        for step in range(steps):
+            t = step / steps
+            t2 = t * t
+            t3 = t2 * t
+            samples.append(tuple(
+                0.5 * (2 * p1[axis] + (p2[axis] - p0[axis]) * t
+                       + (2 * p0[axis] - 5 * p1[axis] + 4 * p2[axis] - p3[axis]) * t2
+                       + (3 * p1[axis] - p0[axis] - 3 * p2[axis] + p3[axis]) * t3)
+                for axis in (0, 1)))
+    samples.append(tuple(control_points[-1]))
+    return samples
+
+def level_control_points(level):
+    """Track centreline for a level: straight at level 1, gentle S-curves later"""
+    nominal_length = 3000 + (level * 2000)
+    amplitude = TRACK_CURVE_AMPLITUDE * (level - 1)
+    count = int(nominal_length // TRACK_CONTROL_SPACING) + 1
+    control_points = []
+    for k in range(count):
+        # Keep the start and finish straight
+        x = amplitude * math.sin(k * 1.3) if 1 < k < count - 1 else 0
+        control_points.append((x, k * TRACK_CONTROL_SPACING))
+    if control_points[-1][1] < nominal_length:
+        control_points.append((0, nominal_length))
+    return control_points
+
+# One baked Track per level, shared read-only by every session (only its render cache fills in)
+level_tracks = {}
+level_tracks_lock = threading.Lock()
+
+def track_for_level(level):
+    """The shared Track for a level, baked on first use"""
+    with level_tracks_lock:
+        track = level_tracks.get(level)
+        if track is None:
+            track = level_tracks[level] = Track(level_control_points(level))
+        return track
+
+def layout_coins(track, rng):
+    """Coin positions along a track, spaced 200-500 units apart"""
+    coin_positions = []
+    distance = 200
+    while distance < track.length - 500:
+        lateral = rng.uniform(-ROAD_WIDTH/3, ROAD_WIDTH/3)
+        x_pos, y_pos = track.point_at(distance, lateral)
+        coin_positions.append([x_pos, y_pos, 10, True, distance, lateral])
+        distance += rng.uniform(200, 500)
+    return coin_positions
+
+def layout_trees(track):
+    """World positions of the roadside trees that fit on a track"""
+    return [track.point_at(distance, lateral) for lateral, distance in TREE_POSITIONS
+            if distance < track.length]
+
+class PreparedLevel:
+    """Everything a race on one level needs, built off the main thread and installed in one swap"""
+    
+    def __init__(self, level, seed, warm_geometry=False):
+        self.level = level
+        self.seed = seed
+        self.warm_geometry = warm_geometry  # Only the displayed session draws, headless ones skip this
+        self.track = None
+        self.coin_positions = []
+        self.tree_positions = []
+        self.build_seconds = 0.0
+        self.ready = threading.Event()
+    
+    def build(self):
+        """Fetch the level's track, optionally warm its road geometry, and lay out coins and trees (no GL calls)"""
+        start = time.perf_counter()
+        track = track_for_level(self.level)
+        if self.warm_geometry:
+            warm_road_geometry(track)
+        self.coin_positions = layout_coins(track, random.Random(self.seed))
+        self.tree_positions = layout_trees(track)
+        self.track = track
+        self.build_seconds = time.perf_counter() - start
+        self.ready.set()
+        return self
+
+class CarBatch:
+    """Physics state of the cars in one or more races, one list per field indexed by car slot
+    
+    A RaceSession gets a batch of its own; the training env puts all of its races in one batch
+    so a tick moves every car in single passes over these lists. Each Car reads and writes
+    its slot through properties of the same name.
+    """
+    
+    FIELDS = ('x', 'y', 'prev_x', 'prev_y', 'velocity_x', 'velocity_y', 'speed', 'track_s', 'track_offset',
+              'track_segment', 'heading', 'crashed', 'finished', 'laps_completed', 'race_time')
+    
+    def __init__(self):
+        self.cars = []  # Car in each slot
+        for name in self.FIELDS:
+            setattr(self, name, [])
+    
+    def add_car(self, car):
+        """Append a zeroed slot for a new car and return its index"""
+        for name in self.FIELDS:
+            getattr(self, name).append(0)
+        self.cars.append(car)
+        return len(self.cars) - 1
+    
+    def integrate(self, slots, dt, substeps=1):
+        """Drag, movement, track projection, wall clamp and lap check for the cars in `slots`
+        
+        One pass over the field lists; the rare wall, coin and lap events go through Car methods.
+        """
+        x, y, prev_x, prev_y = self.x, self.y, self.prev_x, self.prev_y
+        velocity_x, velocity_y, speed = self.velocity_x, self.velocity_y, self.speed
+        track_s, track_offset, track_segment, heading = self.track_s, self.track_offset, self.track_segment, self.heading
+        crashed, finished, cars = self.crashed, self.finished, self.cars
+        
+        # Regular physics only, drag split evenly across substeps
+        drag = AIR_RESISTANCE if substeps == 1 else AIR_RESISTANCE ** (1.0 / substeps)
+        scale = dt * 60
+        boundary = ROAD_WIDTH / 2 - 20
+        for slot in slots:
+            # Start of this step, used by the swept collision and coin tests
+            prev_x[slot] = x[slot]
+            prev_y[slot] = y[slot]
+            if crashed[slot]:
+                continue
+            
+            vx = velocity_x[slot] = velocity_x[slot] * drag
+            vy = velocity_y[slot] = velocity_y[slot] * drag
+            x[slot] += vx * scale
+            y[slot] += vy * scale
+            
+            # Project onto the track, starting from last step's segment
+            car = cars[slot]
+            session = car.session
+            track = session.track
+            s, offset, segment = track.project(x[slot], y[slot], track_segment[slot])
+            track_s[slot] = s
+            track_offset[slot] = offset
+            track_segment[slot] = segment
+            heading[slot] = track.heading_at(segment)
+            speed[slot] = math.sqrt(vx * vx + vy * vy)
+            
+            # Coin collection for player
+            if car.is_player:
+                car.collect_coins()
+            
+            # Keep car on road (boundary collision in track space)
+            if abs(offset) > boundary:
+                # Bounce the sideways part of the velocity back at 30%
+                forward_x, forward_y = track.tangents[segment]
+                car.push_sideways(-(vx * forward_y - vy * forward_x) * 1.3)
+                speed[slot] *= 0.5
+                car.place_on_track(s, boundary if offset > 0 else -boundary, reset_sweep=False)
+            
+            # Check finish line and lap completion for ALL cars
+            if track_s[slot] >= session.finish_line_position and not finished[slot]:
+                car.complete_lap()
+    
+    def collide(self, slots):
+        """Swept car-car tests between the cars of one race; True if the player crashed"""
+        x, y, prev_x, prev_y = self.x, self.y, self.prev_x, self.prev_y
+        crashed, cars = self.crashed, self.cars
+        for i, a in enumerate(slots):
+            if crashed[a]:
+                continue
+            for b in slots[i + 1:]:
+                if crashed[b]:
+                    continue
+                if swept_circle_hit(prev_x[a], prev_y[a], x[a], y[a], prev_x[b], prev_y[b], x[b], y[b],
+                                    CAR_COLLISION_DISTANCE):
+                    crashed[a] = True
+                    crashed[b] = True
+                    if cars[a].is_player or cars[b].is_player:
+                        return True
+        return False
+
+def batch_field(name):
+    """Car property backed by its batch's `name` list at the car's slot"""
+    def get(car):
+        return getattr(car.batch, name)[car.slot]
+    
+    def set(car, value):
+        getattr(car.batch, name)[car.slot] = value
+    
+    return property(get, set)
 
 class Car:
-    def __init__(self, position, color, is_player=False):
+    # Physics state lives in the session's CarBatch
+    x = batch_field('x')
+    y = batch_field('y')
+    prev_x = batch_field('prev_x')
+    prev_y = batch_field('prev_y')
+    velocity_x = batch_field('velocity_x')
+    velocity_y = batch_field('velocity_y')
+    speed = batch_field('speed')
+    track_s = batch_field('track_s')
+    track_offset = batch_field('track_offset')
+    track_segment = batch_field('track_segment')
+    heading = batch_field('heading')
+    crashed = batch_field('crashed')
+    finished = batch_field('finished')
+    laps_completed = batch_field('laps_completed')
+    race_time = batch_field('race_time')
+    
+    def __init__(self, session, position, color, is_player=False):
+        self.session = session
+        self.batch = session.car_batch
+        self.slot = self.batch.add_car(self)
         self.x, self.y, self.z = position
         self.velocity_x = 0
         self.velocity_y = 0
@@ -97,65 +579,76 @@ class Car:
         self.crashed = False
         self.laps_completed = 0
         
-    def update(self, dt):
-        global coins_collected, current_lap
+        # Track space position: distance along, lateral offset and last known segment
+        self.track_s = 0
+        self.track_offset = 0
+        self.track_segment = 0
+        self.heading = 0
+        self.place_on_track(self.y, self.x)
         
-        if self.crashed:
-            return
-        
-        # Regular physics only
-        self.velocity_x *= AIR_RESISTANCE
-        self.velocity_y *= AIR_RESISTANCE
-        
-        # Update position
-        self.x += self.velocity_x * dt * 60
-        self.y += self.velocity_y * dt * 60
-        
-        # Calculate current speed
-        self.speed = math.sqrt(self.velocity_x**2 + self.velocity_y**2)
+        # AI lane planner state
+        self.target_lane = self.track_offset
+        self.ai_blocked = False
+    
+    def place_on_track(self, distance, lateral, reset_sweep=True):
+        """Move the car to a track space position
         
-        # Coin collection for player
-        if self.is_player:
-            self.collect_coins()
+        Teleports (grid placement, lap resets) also reset the sweep start; the wall clamp
+        passes reset_sweep=False so this substep is still tested along its whole path.
+        """
+        track = self.session.track
+        self.x, self.y = track.point_at(distance, lateral)
+        if reset_sweep:
+            self.prev_x, self.prev_y = self.x, self.y
+        self.track_s = distance
+        self.track_offset = lateral
+        self.track_segment = track.segment_at(distance)
+        self.heading = track.heading_at(self.track_segment)
+    
+    def push_forward(self, amount):
+        """Add velocity along the track direction"""
+        forward_x, forward_y = self.session.track.tangents[self.track_segment]
+        self.velocity_x += forward_x * amount
+        self.velocity_y += forward_y * amount
+    
+    def push_sideways(self, amount):
+        """Add velocity across the track (positive = right)"""
+        forward_x, forward_y = self.session.track.tangents[self.track_segment]
+        self.velocity_x += forward_y * amount
+        self.velocity_y -= forward_x * amount
         
-        # Keep car on road (boundary collision)
-        if abs(self.x) > ROAD_WIDTH / 2 - 20:
-            self.velocity_x *= -0.3
-            self.speed *= 0.5
-            if self.x > 0:
-                self.x = ROAD_WIDTH / 2 - 20
-            else:
-                self.x = -ROAD_WIDTH / 2 + 20
+    def update(self, dt, substeps=1):
+        """Step this car alone; races step all their cars together through CarBatch.integrate"""
+        self.batch.integrate((self.slot,), dt, substeps)
+    
+    def complete_lap(self):
+        """Finish line crossed: finish the race or go back to the start for the next lap"""
+        session = self.session
+        self.laps_completed += 1
         
-        # Check finish line and lap completion for ALL cars
-        if self.y >= FINISH_LINE_POSITION and not self.finished:
-            self.laps_completed += 1
-            
-            if self.laps_completed >= total_laps:
-                self.finished = True
-                self.race_time = time.time() - race_start_time
-            else:
-                # Reset position for next lap
-                if self.is_player:
-                    self.y = 50
-                    current_lap = self.laps_completed + 1
-                else:
-                    # AI cars also reset for multiple laps
-                    self.y = random.uniform(50, 150)
+        if self.laps_completed >= session.total_laps:
+            self.finished = True
+            self.race_time = session.race_clock
+        elif self.is_player:
+            # Reset position for next lap
+            self.place_on_track(50, self.track_offset)
+            session.current_lap = self.laps_completed + 1
+        else:
+            # AI cars also reset for multiple laps
+            self.place_on_track(session.rng.uniform(50, 150), self.track_offset)
     
     def collect_coins(self):
-        global coins_collected
-        
-        for coin in coin_positions:
-            if coin[3]:
-                distance = math.sqrt((self.x - coin[0])**2 + (self.y - coin[1])**2)
-                if distance < 30:
-                    coin[3] = False
-                    coins_collected += 1
+        session = self.session
+        x0, y0, x1, y1 = self.prev_x, self.prev_y, self.x, self.y
+        s = self.track_s
+        for coin in session.coins_between(s - COIN_SEARCH_DISTANCE, s + COIN_SEARCH_DISTANCE):
+            if swept_circle_hit(x0, y0, x1, y1, coin[0], coin[1], coin[0], coin[1], COIN_PICKUP_DISTANCE):
+                coin[3] = False
+                session.coins_collected += 1
     
     def accelerate(self):
         if not self.crashed and self.speed < self.max_speed:
-            self.velocity_y += self.acceleration_power
+            self.push_forward(self.acceleration_power)
     
     def brake(self):
         if not self.crashed and self.speed > 0.1:
@@ -164,12 +657,12 @@ class Car:
     
     def steer_left(self):
         if not self.crashed and self.speed > 1:
-            self.velocity_x -= self.steering_power * 0.3
+            self.push_sideways(-self.steering_power * 0.3)
             self.rotation = max(-15, self.rotation - 2)
     
     def steer_right(self):
         if not self.crashed and self.speed > 1:
-            self.velocity_x += self.steering_power * 0.3
+            self.push_sideways(self.steering_power * 0.3)
             self.rotation = min(15, self.rotation + 2)
     
     def center_rotation(self):
@@ -178,21 +671,1095 @@ class Car:
         elif self.rotation < 0:
             self.rotation = min(0, self.rotation + 1)
 
-# Game Objects
-player_car = Car((0, 0, 5), (1, 0, 0), True)
-ai_cars = [
-    Car((-40, 50, 5), (0, 1, 0)),
-    Car((40, 100, 5), (0, 0, 1)),
-    Car((-20, 150, 5), (1, 1, 0))
-]
-all_cars = [player_car] + ai_cars
+class TrackOccupancy:
+    """Cars bucketed by distance along the track, so a query only visits the buckets it spans"""
+    
+    def __init__(self, bin_length=AI_PLAN_BIN_LENGTH):
+        self.bin_length = bin_length
+        self.bins = {}
+    
+    def rebuild(self, cars):
+        """Re-bucket every car with its distance as of now, O(n) per tick"""
+        bins = {}
+        for car in cars:
+            s = car.track_s
+            bins.setdefault(int(s // self.bin_length), []).append((s, car))
+        self.bins = bins
+    
+    def cars_between(self, s_start, s_end):
+        found = []
+        for index in range(int(s_start // self.bin_length), int(s_end // self.bin_length) + 1):
+            for s, car in self.bins.get(index, ()):
+                if s_start <= s <= s_end:
+                    found.append(car)
+        return found
 
-# Input handling
-keys = {
-    b'w': False, b's': False, b'a': False, b'd': False,
-    b' ': False, b'r': False, b'p': False, b'c': False,
-    b'n': False
-}
+def plan_ai_lane(car, neighbors, coins):
+    """Score each candidate lane over the horizon and return (best lane, blocked, work done)
+    
+    Neighbors are assumed to hold their lane and speed; the AI car is assumed to reach a
+    new lane linearly over AI_LANE_CHANGE_SECONDS. Predicted near misses cost more the
+    sooner they happen, coins in a lane are a small bonus.
+    """
+    clearance_sq = (2 * CAR_COLLISION_DISTANCE) ** 2
+    
+    # Read the batch-backed car state once, the loops below visit it lanes x steps x neighbors times
+    own_s, own_offset, own_velocity = car.track_s, car.track_offset, car.speed * 60
+    others = [(other.track_s, other.speed * 60, other.track_offset) for other in neighbors]
+    
+    # The along-track gap doesn't depend on the lane, so work it out once per sample and drop
+    # neighbors already too far ahead or behind to come within the clearance in any lane
+    samples = []
+    for step in range(1, AI_PLAN_STEPS + 1):
+        t = AI_PLAN_HORIZON_SECONDS * step / AI_PLAN_STEPS
+        own_at = own_s + own_velocity * t
+        gaps = []
+        for other_s, other_velocity, other_offset in others:
+            ds = other_s + other_velocity * t - own_at
+            if ds * ds < clearance_sq:
+                gaps.append((ds * ds, other_offset))
+        penalty = AI_COLLISION_COST * (AI_PLAN_STEPS + 1 - step) / AI_PLAN_STEPS
+        samples.append((step == 1, min(1.0, t / AI_LANE_CHANGE_SECONDS), penalty, gaps))
+    
+    best_lane, best_cost, best_blocked = car.target_lane, None, False
+    for lane in AI_PLAN_LANES:
+        cost = AI_LANE_CHANGE_COST * abs(lane - car.target_lane)
+        blocked = False
+        for first_step, lane_share, penalty, gaps in samples:
+            lateral = own_offset + (lane - own_offset) * lane_share
+            for ds_sq, other_offset in gaps:
+                dl = other_offset - lateral
+                if ds_sq + dl * dl < clearance_sq:
+                    cost += penalty
+                    blocked = blocked or first_step
+        for coin in coins:
+            if abs(coin[5] - lane) < COIN_PICKUP_DISTANCE:
+                cost -= AI_COIN_BONUS
+        if best_cost is None or cost < best_cost:
+            best_lane, best_cost, best_blocked = lane, cost, blocked
+    
+    work = len(AI_PLAN_LANES) * (AI_PLAN_STEPS * len(neighbors) + len(coins))
+    return best_lane, best_blocked, work
+
+# AI grid slots as (lateral offset, distance along, height)
+AI_STARTING_POSITIONS = [(-40, 50, 5), (40, 100, 5), (-20, 150, 5)]
+
+class RaceSession:
+    """One independent race and all of its state, so a process can host many of them"""
+    
+    def __init__(self, level=1, seed=None, car_batch=None):
+        self.rng = random.Random(seed)
+        self.car_batch = car_batch if car_batch is not None else CarBatch()
+        
+        self.game_state = MENU
+        self.race_clock = 0.0  # Simulated seconds since the race started
+        self.game_complete_time = None
+        
+        # Night mode only
+        self.is_night_mode = False
+        self.first_person_view = False
+        
+        # Custom race settings
+        self.custom_laps = 1
+        self.custom_difficulty = 1  # 1=Easy, 2=Medium, 3=Hard
+        
+        # Game features
+        self.coins_collected = 0
+        self.current_level = level
+        self.races_won = 0
+        self.current_lap = 1
+        self.total_laps = 1
+        
+        # Physics stepping
+        self.physics_accumulator = 0.0
+        self.physics_stats = {'ticks': 0, 'last_tick_substeps': 0, 'substep_histogram': {}}
+        self.pending_time = 0.0  # Simulation time owed to this session by a RaceHost
+        
+        # Input handling
+        self.keys = {
+            b'w': False, b's': False, b'a': False, b'd': False,
+            b' ': False, b'r': False, b'p': False, b'c': False,
+            b'n': False
+        }
+        self.input_events = []   # (timestamp, key, pressed) waiting for the next simulation tick
+        self.tapped_keys = set() # Keys pressed during the current tick, so a tap shorter than a tick still counts
+        self.applied_input_times = []  # Timestamps of events a tick has applied but no frame has shown yet
+        
+        # Track and coins
+        self.track = None
+        self.road_length = 0
+        self.finish_line_position = 0
+        self.coin_positions = []
+        self.coin_distances = []  # Sorted track distance of each coin, for range queries
+        self.tree_positions = []
+        self.prepared_level = None  # Next level being built by a background worker
+        self.occupancy = TrackOccupancy()
+        self.ai_plan_cursor = 0  # AI car the next tick's planning budget starts with
+        self.setup_level_track()
+        
+        # Game Objects
+        self.player_car = Car(self, (0, 0, 5), (1, 0, 0), True)
+        self.ai_cars = [
+            Car(self, (-40, 50, 5), (0, 1, 0)),
+            Car(self, (40, 100, 5), (0, 0, 1)),
+            Car(self, (-20, 150, 5), (1, 1, 0))
+        ]
+        self.all_cars = [self.player_car] + self.ai_cars
+        self.car_slots = [car.slot for car in self.all_cars]
+    
+    def setup_level_track(self):
+        """Bake the current level's track and derive road length and finish line from it"""
+        self.track = track_for_level(self.current_level)
+        self.road_length = self.track.length
+        self.finish_line_position = self.road_length - 200
+        self.tree_positions = layout_trees(self.track)
+    
+    def generate_collectibles(self):
+        """Generate coins on the road"""
+        self.coin_positions = layout_coins(self.track, self.rng)
+        self.coin_distances = [coin[4] for coin in self.coin_positions]
+    
+    def coins_between(self, s_start, s_end):
+        """Uncollected coins in a stretch of track"""
+        first = bisect.bisect_left(self.coin_distances, s_start)
+        last = bisect.bisect_right(self.coin_distances, s_end)
+        return [coin for coin in self.coin_positions[first:last] if coin[3]]
+    
+    def prepare_next_level(self):
+        """Start building the level the next race will use on a background worker (displayed session only)"""
+        if self.prepared_level is not None and self.prepared_level.level == self.current_level:
+            return
+        self.prepared_level = PreparedLevel(self.current_level, self.rng.getrandbits(32), warm_geometry=True)
+        threading.Thread(target=self.prepared_level.build, daemon=True).start()
+    
+    def take_prepared_level(self):
+        """The prepared current level, waiting briefly for the worker or building it here"""
+        prepared = self.prepared_level
+        self.prepared_level = None
+        if prepared is None or prepared.level != self.current_level:
+            return PreparedLevel(self.current_level, self.rng.getrandbits(32)).build()
+        if not prepared.ready.wait(LEVEL_PREPARE_WAIT_SECONDS):
+            # Same seed, so the layout matches what the worker would have produced
+            return PreparedLevel(prepared.level, prepared.seed, prepared.warm_geometry).build()
+        return prepared
+    
+    def install_level(self, prepared):
+        """Swap the track, coins and scenery of a prepared level in together"""
+        self.track = prepared.track
+        self.road_length = prepared.track.length
+        self.finish_line_position = self.road_length - 200
+        self.coin_positions = prepared.coin_positions
+        self.coin_distances = [coin[4] for coin in self.coin_positions]
+        self.tree_positions = prepared.tree_positions
+    
+    def initialize_race_cars(self):
+        """Initialize all 4 cars (player + 3 AI) for racing"""
+        # Reset player car
+        player_car = self.player_car
+        player_car.z = 5
+        player_car.place_on_track(0, 0)
+        player_car.velocity_x = player_car.velocity_y = 0
+        player_car.rotation = 0
+        player_car.finished = False
+        player_car.crashed = False
+        player_car.laps_completed = 0
+        player_car.speed = 0
+        
+        # Reset all 3 AI cars with proper starting positions
+        for i, car in enumerate(self.ai_cars):
+            if i < len(AI_STARTING_POSITIONS):
+                lateral, distance, car.z = AI_STARTING_POSITIONS[i]
+            else:
+                lateral, distance, car.z = self.rng.uniform(-50, 50), self.rng.uniform(50, 200), 5
+            car.place_on_track(distance, lateral)
+            car.target_lane = lateral
+            car.ai_blocked = False
+            
+            car.velocity_x = car.velocity_y = 0
+            car.rotation = 0
+            car.finished = False
+            car.crashed = False
+            car.laps_completed = 0
+            car.speed = 0
+    
+    def start_race(self, laps):
+        """Fresh race on the current level"""
+        self.total_laps = laps
+        self.current_lap = 1
+        self.game_state = RACING
+        self.race_clock = 0.0
+        self.install_level(self.take_prepared_level())
+        
+        # Use proper initialization function
+        self.initialize_race_cars()
+    
+    def restart_highway_race(self):
+        """Restart race with all AI cars"""
+        self.current_lap = 1
+        
+        # A level prepared on the result screen also brings the new track after a level up
+        if self.prepared_level is not None and self.prepared_level.level == self.current_level:
+            self.install_level(self.take_prepared_level())
+        else:
+            self.generate_collectibles()
+        
+        # Use proper initialization function
+        self.initialize_race_cars()
+        
+        self.game_state = RACING
+        self.race_clock = 0.0
+    
+    def level_up(self):
+        """Progress to next level with auto-restart"""
+        self.races_won += 1
+        self.current_level += 1
+        
+        # If we just finished level 5, go to GAME_COMPLETE and start auto-restart timer
+        if self.current_level > max_level:
+            self.game_state = GAME_COMPLETE
+            self.game_complete_time = time.time()
+            # Clamp level display at max
+            self.current_level = max_level
+    
+    def reset_to_new_game(self):
+        """Reset to new game (Level 1)"""
+        self.current_level = 1
+        self.races_won = 0
+        self.coins_collected = 0
+        # Recompute track metrics for level 1
+        self.setup_level_track()
+        self.game_state = MENU
+    
+    def player_won(self):
+        """Player finished and no AI car that finished did it faster"""
+        for car in self.ai_cars:
+            if car.finished and not car.crashed and car.race_time < self.player_car.race_time:
+                return False
+        return True
+    
+    def queue_input(self, key, pressed, timestamp=None):
+        """Record a key event for the next simulation tick instead of flipping the key state now"""
+        if key in self.keys:
+            if timestamp is None:
+                timestamp = time.perf_counter()
+            self.input_events.append((timestamp, key, pressed))
+    
+    def consume_input_events(self):
+        """Apply queued key events in order at the start of a tick"""
+        self.tapped_keys.clear()
+        if not self.input_events:
+            return
+        
+        for timestamp, key, pressed in self.input_events:
+            self.keys[key] = pressed
+            if pressed:
+                self.tapped_keys.add(key)
+            if self.game_state == RACING:
+                self.applied_input_times.append(timestamp)
+        self.input_events.clear()
+    
+    def key_active(self, key):
+        return self.keys[key] or key in self.tapped_keys
+    
+    def handle_highway_controls(self, dt):
+        """Control system"""
+        if self.game_state != RACING:
+            return
+        
+        key_active = self.key_active
+        player_car = self.player_car
+        if key_active(b'w'):
+            player_car.accelerate()
+        if key_active(b's'):
+            player_car.brake()
+        if key_active(b'a'):
+            player_car.steer_left()
+        if key_active(b'd'):
+            player_car.steer_right()
+        
+        if not key_active(b'a') and not key_active(b'd'):
+            player_car.center_rotation()
+    
+    def plan_ai_lanes(self):
+        """Replan AI target lanes round-robin until this tick's shared budget is spent"""
+        batch = self.car_batch
+        track_s, speed, crashed, finished = batch.track_s, batch.speed, batch.crashed, batch.finished
+        self.occupancy.rebuild(self.all_cars)
+        ai_cars = self.ai_cars
+        count = len(ai_cars)
+        work_done = 0
+        for n in range(count):
+            index = (self.ai_plan_cursor + n) % count
+            car = ai_cars[index]
+            slot = car.slot
+            if finished[slot] or crashed[slot]:
+                continue
+            if work_done >= AI_PLAN_TICK_BUDGET:
+                # Out of budget, the rest keep last tick's lane and go first next tick
+                self.ai_plan_cursor = index
+                return
+            
+            own_s = track_s[slot]
+            horizon = max(speed[slot] * 60 * AI_PLAN_HORIZON_SECONDS, 2 * CAR_COLLISION_DISTANCE)
+            neighbors = [other for other in self.occupancy.cars_between(own_s - 2 * CAR_COLLISION_DISTANCE,
+                                                                          own_s + horizon)
+                         if other is not car]
+            if len(neighbors) > AI_PLAN_MAX_NEIGHBORS:
+                neighbors.sort(key=lambda other: abs(track_s[other.slot] - own_s))
+                del neighbors[AI_PLAN_MAX_NEIGHBORS:]
+            coins = self.coins_between(own_s, own_s + horizon)
+            car.target_lane, car.ai_blocked, work = plan_ai_lane(car, neighbors, coins)
+            work_done += work
+        self.ai_plan_cursor = 0
+    
+    def update_ai_racers(self, dt):
+        """AI with difficulty adjustments (movement happens in the physics substeps)"""
+        self.plan_ai_lanes()
+        
+        # Same pushes as Car.push_forward and push_sideways, straight on the batch's lists
+        batch = self.car_batch
+        velocity_x, velocity_y, track_offset = batch.velocity_x, batch.velocity_y, batch.track_offset
+        track_segment, crashed, finished = batch.track_segment, batch.crashed, batch.finished
+        tangents = self.track.tangents
+        for car in self.ai_cars:
+            slot = car.slot
+            if finished[slot] or crashed[slot]:
+                continue
+            
+            # AI speed based on custom difficulty
+            difficulty_multiplier = 0.15 + (self.custom_difficulty * 0.01)
+            ai_speed_multiplier = difficulty_multiplier + (self.current_level * 0.01)
+            
+            # Ensure each AI car gets proper acceleration, easing off when every lane is blocked
+            throttle = 0.5 if car.ai_blocked else 1.0
+            forward_x, forward_y = tangents[track_segment[slot]]
+            push = car.acceleration_power * ai_speed_multiplier * throttle
+            velocity_x[slot] += forward_x * push
+            velocity_y[slot] += forward_y * push
+            
+            # Steer toward the planned lane, damping the sideways velocity so it settles
+            lateral_velocity = velocity_x[slot] * forward_y - velocity_y[slot] * forward_x
+            steer = (car.target_lane - track_offset[slot]) * AI_LANE_GAIN - lateral_velocity * AI_LANE_DAMPING
+            steer = max(-AI_MAX_STEER, min(AI_MAX_STEER, steer))
+            velocity_x[slot] += forward_y * steer
+            velocity_y[slot] -= forward_x * steer
+    
+    def choose_physics_substeps(self, dt):
+        """Enough substeps that no pair of cars closes more than PHYSICS_SUBSTEP_DISTANCE per substep"""
+        if not ADAPTIVE_SUBSTEPPING:
+            return 1
+        
+        # No two cars close faster than the spread of their velocity components, an O(n) bound
+        batch = self.car_batch
+        moving = [slot for slot in self.car_slots if not batch.crashed[slot]]
+        if len(moving) < 2:
+            return 1
+        velocities_x = [batch.velocity_x[slot] for slot in moving]
+        velocities_y = [batch.velocity_y[slot] for slot in moving]
+        relative_speed = math.hypot(max(velocities_x) - min(velocities_x), max(velocities_y) - min(velocities_y))
+        relative_travel = relative_speed * dt * 60
+        return max(1, min(MAX_PHYSICS_SUBSTEPS, math.ceil(relative_travel / PHYSICS_SUBSTEP_DISTANCE)))
+    
+    def simulate_tick(self, dt):
+        """One tick of this race alone, a batch of one for simulate_races"""
+        simulate_races([self], dt)
+    
+    def update_highway_game(self, dt):
+        """Main update loop"""
+        self.consume_input_events()
+        if self.game_state != RACING:
+            return
+        
+        self.simulate_tick(dt)
+        if self.player_car.crashed:
+            self.game_state = FINISHED
+            return
+        
+        if self.player_car.finished:
+            if self.player_won():
+                self.level_up()
+            
+            self.game_state = FINISHED
+    
+    def advance(self, dt):
+        """One idle tick: auto-restart timer plus variable or fixed rate physics"""
+        # Handle auto-restart when in GAME_COMPLETE
+        if self.game_state == GAME_COMPLETE and self.game_complete_time is not None:
+            if (time.time() - self.game_complete_time) >= AUTO_RESTART_SECONDS:
+                self.reset_to_new_game()
+        
+        if PHYSICS_TICK_RATE > 0:
+            # Fixed rate physics, the swept tests keep collisions from tunnelling at low rates
+            self.physics_accumulator += dt
+            tick = 1.0 / PHYSICS_TICK_RATE
+            while self.physics_accumulator >= tick:
+                self.update_highway_game(tick)
+                self.physics_accumulator -= tick
+        else:
+            self.update_highway_game(dt)
+
+def simulate_races(races, dt):
+    """Controls, AI, substepped physics and collisions for one tick of races sharing a CarBatch
+    
+    The game loop and RaceHost pass a single race; the training env passes all of its races,
+    so each substep is one pass over the batch's field lists for every car. A race stops early
+    when its player crashes, and game state changes are left to the caller.
+    """
+    batch = races[0].car_batch
+    groups = {}  # Substep count -> races that need that many this tick
+    for race in races:
+        race.race_clock += dt
+        race.handle_highway_controls(dt)
+        race.update_ai_racers(dt)  # Steering and throttle for all 3 AI cars
+        
+        substeps = race.choose_physics_substeps(dt)
+        physics_stats = race.physics_stats
+        physics_stats['ticks'] += 1
+        physics_stats['last_tick_substeps'] = substeps
+        histogram = physics_stats['substep_histogram']
+        histogram[substeps] = histogram.get(substeps, 0) + 1
+        groups.setdefault(substeps, []).append(race)
+    
+    for substeps, group in groups.items():
+        for _ in range(substeps):
+            # Move every car of the group, then test each race's swept paths
+            batch.integrate([slot for race in group for slot in race.car_slots], dt / substeps, substeps)
+            group = [race for race in group if not batch.collide(race.car_slots)]
+            if not group:
+                break
+
+class RaceHost:
+    """Ticks many headless RaceSessions round-robin in one process
+    
+    Every round each session is owed the elapsed wall time and runs fixed ticks to pay it
+    back, at most `tick_budget` ticks per round, so one lagging session cannot starve the
+    rest. A round that hits its deadline resumes from the next session on the following call.
+    """
+    
+    def __init__(self, tick_rate=HOST_TICK_RATE, tick_budget=HOST_SESSION_TICK_BUDGET):
+        self.sessions = []
+        self.tick_dt = 1.0 / tick_rate
+        self.tick_budget = tick_budget
+        self.next_index = 0
+        self.ticks_run = 0
+        self.dropped_seconds = 0.0
+    
+    def add_session(self, session):
+        session.pending_time = 0.0
+        self.sessions.append(session)
+        return session
+    
+    def remove_session(self, session):
+        self.sessions.remove(session)
+        if self.next_index >= len(self.sessions):
+            self.next_index = 0
+    
+    def run_round(self, elapsed, deadline=None):
+        """Credit elapsed time to every session, then tick them round-robin until done or the deadline"""
+        for session in self.sessions:
+            session.pending_time += elapsed
+            if session.pending_time > HOST_MAX_BACKLOG_SECONDS:
+                # Too far behind to catch up, drop the excess instead of spiralling
+                self.dropped_seconds += session.pending_time - HOST_MAX_BACKLOG_SECONDS
+                session.pending_time = HOST_MAX_BACKLOG_SECONDS
+        
+        count = len(self.sessions)
+        for n in range(count):
+            index = (self.next_index + n) % count
+            if deadline is not None and time.perf_counter() >= deadline:
+                self.next_index = index
+                return
+            
+            session = self.sessions[index]
+            ticks = 0
+            while session.pending_time >= self.tick_dt and ticks < self.tick_budget:
+                session.advance(self.tick_dt)
+                session.pending_time -= self.tick_dt
+                ticks += 1
+            self.ticks_run += ticks
+        
+        # Start the next round one session later so nobody is always last
+        if count:
+            self.next_index = (self.next_index + 1) % count
+
+def benchmark_race_host(session_count=HOST_BENCHMARK_SESSIONS, duration=HOST_BENCHMARK_SECONDS):
+    """Run many sessions with the player holding the throttle, restarting races as they end"""
+    host = RaceHost()
+    for i in range(session_count):
+        race = host.add_session(RaceSession(seed=i))
+        race.start_race(1)
+        race.keys[b'w'] = True
+    
+    start = last = time.perf_counter()
+    while last - start < duration:
+        now = time.perf_counter()
+        host.run_round(now - last, deadline=now + host.tick_dt)
+        last = now
+        for race in host.sessions:
+            if race.game_state == FINISHED:
+                race.start_race(1)
+        
+        # Sleep out the rest of the tick interval if the round finished early
+        remaining = last + host.tick_dt - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+    
+    elapsed = time.perf_counter() - start
+    result = {
+        "sessions": session_count,
+        "seconds": round(elapsed, 3),
+        "ticks": host.ticks_run,
+        "ticks_per_second": round(host.ticks_run / elapsed, 1),
+        "target_ticks_per_second": round(session_count / host.tick_dt, 1),
+        "dropped_seconds": round(host.dropped_seconds, 3)
+    }
+    print(json.dumps(result))
+    return result
+
+# The race shown in the window; every GLUT callback works on this session
+session = RaceSession()
+
+class RenderQueue:
+    """Collects the 3D pass and draws it sorted by primitive, line width and colour
+    
+    Meshes are shared client vertex arrays, bound once per mesh type; each instance is then a
+    matrix transform and one glDrawArrays, so N instances still cost N draw calls. Track
+    surfaces and lines are arrays baked once per track, one glDrawArrays each.
+    """
+    
+    # Only independent-primitive lists can share a glBegin/glEnd; strips, fans and polygons
+    # would be stitched into one wrong shape, so each of those gets its own batch
+    LIST_PRIMITIVES = (GL_POINTS, GL_LINES, GL_TRIANGLES, GL_QUADS)
+    LINE_PRIMITIVES = (GL_LINES, GL_LINE_STRIP, GL_LINE_LOOP)
+    
+    def __init__(self):
+        self.items = []
+        self.arrays = []        # ((primitive, width, colour), (packed vertices, count)) for this frame
+        self.instances = {}     # Mesh name -> [(color, transform)] for this frame
+        self.current_width = None
+        self.current_color = None
+        self.state_changes = 0
+        self.draw_calls = 0
+    
+    def begin_frame(self):
+        self.items = []
+        self.arrays = []
+        self.instances = {}
+        self.current_width = None
+        self.current_color = None
+        self.state_changes = 0
+        self.draw_calls = 0
+    
+    def submit(self, primitive, color, vertices, line_width=1):
+        """Queue raw vertices; list primitives sharing primitive, width and colour share one glBegin/glEnd"""
+        if primitive not in self.LINE_PRIMITIVES:
+            line_width = 0  # Width only matters for lines
+        self.items.append(((primitive, line_width, tuple(color)), vertices))
+    
+    def submit_array(self, primitive, color, vertex_array, line_width=1):
+        """Queue a prebuilt (packed vertices, count) array, drawn with one glDrawArrays"""
+        if primitive not in self.LINE_PRIMITIVES:
+            line_width = 0
+        self.arrays.append(((primitive, line_width, tuple(color)), vertex_array))
+    
+    def submit_mesh(self, mesh, color, transform):
+        """Queue one instance of a shared mesh at an (x, y, z, rotation) transform"""
+        self.instances.setdefault(mesh, []).append((tuple(color), transform))
+    
+    def prepare(self):
+        """Put the frame's work in draw order without any GL calls, so the soak test can run it headless
+        
+        Sorts the array and raw items in place and returns (shared mesh arrays, instances) per mesh type.
+        """
+        self.arrays.sort(key=lambda item: item[0])
+        self.items.sort(key=lambda item: item[0])
+        return [(mesh_templates[mesh], self.instances[mesh]) for mesh in sorted(self.instances)]
+    
+    def flush_meshes(self, meshes):
+        """Bind each mesh type's shared arrays once, then one transform and glDrawArrays per instance"""
+        if not meshes:
+            return
+        
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        for (vertex_data, normal_data, vertex_count), instances in meshes:
+            glVertexPointer(3, GL_FLOAT, 0, vertex_data)
+            glNormalPointer(GL_FLOAT, 0, normal_data)
+            self.state_changes += 1
+            for color, (x, y, z, rotation) in instances:
+                if color != self.current_color:
+                    glColor3f(*color)
+                    self.current_color = color
+                    self.state_changes += 1
+                glPushMatrix()
+                glTranslatef(x, y, z)
+                glRotatef(rotation, 0, 0, 1)
+                glDrawArrays(GL_TRIANGLES, 0, vertex_count)
+                glPopMatrix()
+                self.draw_calls += 1
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+    
+    def apply_state(self, primitive, line_width, color):
+        """Set line width and colour for the next batch, skipping whatever is already current"""
+        if primitive in self.LINE_PRIMITIVES and line_width != self.current_width:
+            glLineWidth(line_width)
+            self.current_width = line_width
+            self.state_changes += 1
+        if color != self.current_color:
+            glColor3f(*color)
+            self.current_color = color
+            self.state_changes += 1
+    
+    def flush(self):
+        """Issue every queued item with the minimal set of state changes"""
+        self.flush_meshes(self.prepare())
+        glNormal3f(0, 0, 1)  # Track surfaces all face up, and the normal array left the current normal undefined
+        
+        # Prebuilt track arrays sorted by primitive, width and colour
+        if self.arrays:
+            glEnableClientState(GL_VERTEX_ARRAY)
+            for (primitive, line_width, color), (vertex_data, vertex_count) in self.arrays:
+                self.apply_state(primitive, line_width, color)
+                glVertexPointer(3, GL_FLOAT, 0, vertex_data)
+                glDrawArrays(primitive, 0, vertex_count)
+                self.draw_calls += 1
+            glDisableClientState(GL_VERTEX_ARRAY)
+        
+        # Then the few raw vertices (start and finish lines) the same way
+        open_batch = None
+        for (primitive, line_width, color), payload in self.items:
+            batch = (primitive, line_width, color)
+            if batch == open_batch and primitive in self.LIST_PRIMITIVES:
+                # Same state as the open glBegin, just keep adding vertices
+                for vertex in payload:
+                    glVertex3f(*vertex)
+                continue
+            
+            if open_batch is not None:
+                glEnd()
+                open_batch = None
+            
+            self.apply_state(primitive, line_width, color)
+            glBegin(primitive)
+            for vertex in payload:
+                glVertex3f(*vertex)
+            open_batch = batch
+            self.draw_calls += 1
+        
+        if open_batch is not None:
+            glEnd()
+        
+        self.items = []
+        self.arrays = []
+
+render_queue = RenderQueue()
+
+class FrameCache:
+    """Last rendered 3D frame kept in a texture, so paused and finished screens redraw as one quad"""
+    
+    def __init__(self):
+        self.texture = None
+        self.valid = False
+        self.width = WINDOW_WIDTH
+        self.height = WINDOW_HEIGHT
+    
+    def invalidate(self):
+        self.valid = False
+    
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+        self.invalidate()
+    
+    def capture(self):
+        """Copy the current back buffer (the 3D pass, before any overlay) into the texture"""
+        if self.texture is None:
+            self.texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            # No mipmaps, so the texture is complete with a non-mipmap filter
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glReadBuffer(GL_BACK)
+        glCopyTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 0, 0, self.width, self.height, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.valid = True
+    
+    def draw(self):
+        """Blit the cached frame as a single full screen textured quad"""
+        glPushAttrib(GL_ALL_ATTRIB_BITS)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        gluOrtho2D(0, 1, 0, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        
+        glColor3f(1, 1, 1)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(0, 0)
+        glTexCoord2f(1, 0)
+        glVertex2f(1, 0)
+        glTexCoord2f(1, 1)
+        glVertex2f(1, 1)
+        glTexCoord2f(0, 1)
+        glVertex2f(0, 1)
+        glEnd()
+        
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glPopAttrib()
+
+frame_cache = FrameCache()
+
+class Headlights:
+    """Night mode spot lights for the K cars nearest the player, on GL_LIGHT1 upwards"""
+    
+    def __init__(self, max_lights=HEADLIGHT_MAX_LIGHTS):
+        self.max_lights = max_lights
+        self.active = 0
+    
+    def setup(self):
+        """Parameters that never change, set once after the GL context exists"""
+        for i in range(self.max_lights):
+            light = GL_LIGHT1 + i
+            glLightfv(light, GL_DIFFUSE, HEADLIGHT_COLOR)
+            glLightfv(light, GL_SPECULAR, HEADLIGHT_COLOR)
+            glLightf(light, GL_SPOT_CUTOFF, HEADLIGHT_CUTOFF_DEGREES)
+            glLightf(light, GL_SPOT_EXPONENT, HEADLIGHT_EXPONENT)
+            glLightf(light, GL_LINEAR_ATTENUATION, HEADLIGHT_LINEAR_ATTENUATION)
+    
+    def select(self, race_session):
+        """Nearest uncrashed cars to the player, searched only in the occupancy buckets around it"""
+        player = race_session.player_car
+        candidates = [car for car in race_session.occupancy.cars_between(player.track_s - HEADLIGHT_RANGE_BEHIND,
+                                                                         player.track_s + HEADLIGHT_RANGE_AHEAD)
+                      if not car.crashed]
+        return heapq.nsmallest(self.max_lights, candidates,
+                               key=lambda car: (car.track_s - player.track_s)**2 + (car.track_offset - player.track_offset)**2)
+    
+    def apply(self, race_session):
+        """Position this frame's lights; call after the camera so they are placed in world space"""
+        night = race_session.is_night_mode
+        glLightfv(GL_LIGHT0, GL_DIFFUSE, NIGHT_LIGHT_COLOR if night else DAY_LIGHT_COLOR)
+        
+        cars = self.select(race_session) if night else []
+        for i in range(self.max_lights):
+            light = GL_LIGHT1 + i
+            if i >= len(cars):
+                glDisable(light)
+                continue
+            
+            car = cars[i]
+            # Same forward vector the car meshes are rotated to
+            angle = math.radians(car.heading + car.rotation)
+            forward_x, forward_y = -math.sin(angle), math.cos(angle)
+            glLightfv(light, GL_POSITION, [car.x + forward_x * HEADLIGHT_FORWARD_OFFSET,
+                                           car.y + forward_y * HEADLIGHT_FORWARD_OFFSET, car.z + 3, 1])
+            glLightfv(light, GL_SPOT_DIRECTION, [forward_x, forward_y, -0.1])
+            glEnable(light)
+        self.active = len(cars)
+
+headlights = Headlights()
+
+class Minimap:
+    """Top-down overview of the whole track, redrawn into a small texture at MINIMAP_UPDATE_HZ
+    
+    Updates render into the bottom left corner of the back buffer before the frame is
+    cleared and copy it into the texture, the same way FrameCache captures frames.
+    """
+    
+    def __init__(self, update_hz=MINIMAP_UPDATE_HZ, width=MINIMAP_WIDTH, height=MINIMAP_HEIGHT):
+        self.update_interval = 1.0 / update_hz
+        self.width = width
+        self.height = height
+        self.texture = None
+        self.next_update = 0.0
+        self.track = None     # Track the bounds were measured for
+        self.bounds = None
+        self.updates = 0
+        self.last_update_ms = 0.0
+    
+    def update_if_due(self, race_session):
+        """Redraw the map texture if the interval has passed or the track changed; call before the frame's glClear"""
+        now = time.perf_counter()
+        if now < self.next_update and race_session.track is self.track:
+            return
+        self.next_update = now + self.update_interval
+        
+        start = now
+        track = race_session.track
+        if track is not self.track:
+            # Road width padding on both sides, stretched so lanes stay visible on long tracks
+            xs = [x for x, y in track.points]
+            ys = [y for x, y in track.points]
+            self.bounds = (min(xs) - ROAD_WIDTH, max(xs) + ROAD_WIDTH, min(ys) - 100, max(ys) + 100)
+            self.track = track
+        
+        glPushAttrib(GL_ALL_ATTRIB_BITS)
+        glViewport(0, 0, self.width, self.height)
+        glEnable(GL_SCISSOR_TEST)
+        glScissor(0, 0, self.width, self.height)
+        glClearColor(0.05, 0.05, 0.1, 1)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        left, right, bottom, top = self.bounds
+        gluOrtho2D(left, right, bottom, top)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        
+        # Road, reusing the strip array the 3D pass already baked
+        glColor3f(0.4, 0.4, 0.4)
+        vertex_data, vertex_count = track.strip(-ROAD_WIDTH/2, ROAD_WIDTH/2, 0)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertex_data)
+        glDrawArrays(GL_QUADS, 0, vertex_count)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        # Every coin and car marker in one batch, colour per vertex
+        glPointSize(MINIMAP_MARKER_SIZE)
+        glBegin(GL_POINTS)
+        glColor3f(*MINIMAP_COIN_COLOR)
+        for coin in race_session.coin_positions:
+            if coin[3]:
+                glVertex2f(coin[0], coin[1])
+        for car in race_session.all_cars:
+            glColor3f(*((0.5, 0.5, 0.5) if car.crashed else car.color))
+            glVertex2f(car.x, car.y)
+        glEnd()
+        
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        
+        if self.texture is None:
+            self.texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glCopyTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 0, 0, self.width, self.height, 0)
+        else:
+            glBindTexture(GL_TEXTURE_2D, self.texture)
+            glCopyTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, 0, 0, self.width, self.height)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glPopAttrib()
+        
+        self.updates += 1
+        self.last_update_ms = (time.perf_counter() - start) * 1000
+    
+    def draw(self):
+        """Composite the last map update into the bottom right corner"""
+        if self.texture is None:
+            return
+        
+        glPushAttrib(GL_ALL_ATTRIB_BITS)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        gluOrtho2D(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        
+        x0 = WINDOW_WIDTH - self.width - MINIMAP_MARGIN
+        y0 = MINIMAP_MARGIN
+        glColor3f(1, 1, 1)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(x0, y0)
+        glTexCoord2f(1, 0)
+        glVertex2f(x0 + self.width, y0)
+        glTexCoord2f(1, 1)
+        glVertex2f(x0 + self.width, y0 + self.height)
+        glTexCoord2f(0, 1)
+        glVertex2f(x0, y0 + self.height)
+        glEnd()
+        
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glPopAttrib()
+
+minimap = Minimap()
+
+class FrameScheduler:
+    """Redraws static screens only on change, paces racing frames and tracks CPU use per state"""
+    
+    def __init__(self, target_fps):
+        self.target_fps = target_fps
+        self.redraw_requested = True
+        self.last_state = None
+        self.last_countdown_tick = None
+        self.next_frame_time = time.perf_counter()
+        
+        # Per state: [cpu seconds, wall seconds]
+        self.cpu_usage = {}
+        self.last_sample_wall = time.perf_counter()
+        self.last_sample_cpu = time.process_time()
+        self.last_report_time = self.last_sample_wall
+    
+    def request_redraw(self):
+        self.redraw_requested = True
+    
+    def should_redraw(self, race_session):
+        """Racing always redraws; static screens only when something visible changed"""
+        state = race_session.game_state
+        if state != self.last_state:
+            self.last_state = state
+            self.redraw_requested = True
+        
+        if state == RACING:
+            self.redraw_requested = False
+            return True
+        
+        # The game complete countdown is shown with one decimal, so redraw on each 0.1s tick
+        if state == GAME_COMPLETE and race_session.game_complete_time is not None:
+            remaining_time = max(0, AUTO_RESTART_SECONDS - (time.time() - race_session.game_complete_time))
+            countdown_tick = int(remaining_time * 10)
+            if countdown_tick != self.last_countdown_tick:
+                self.last_countdown_tick = countdown_tick
+                self.redraw_requested = True
+        
+        redraw = self.redraw_requested
+        self.redraw_requested = False
+        return redraw
+    
+    def wait_for_next_frame(self, state):
+        """Sleep until the next racing frame is due, or poll slowly on static screens"""
+        now = time.perf_counter()
+        if state != RACING:
+            time.sleep(STATIC_SCREEN_POLL_SECONDS)
+            self.next_frame_time = time.perf_counter()
+            return
+        
+        frame_interval = 1.0 / self.target_fps
+        self.next_frame_time += frame_interval
+        if self.next_frame_time < now:
+            # Fell behind (slow frame), don't try to catch up with a burst
+            self.next_frame_time = now
+            return
+        
+        # Coarse sleep, then spin the last couple of milliseconds
+        remaining = self.next_frame_time - now
+        if remaining > SLEEP_SPIN_MARGIN:
+            time.sleep(remaining - SLEEP_SPIN_MARGIN)
+        while time.perf_counter() < self.next_frame_time:
+            pass
+    
+    def record_cpu_usage(self, state):
+        """Charge the CPU and wall time since the last sample to the given game state"""
+        now_wall = time.perf_counter()
+        now_cpu = time.process_time()
+        usage = self.cpu_usage.setdefault(state, [0.0, 0.0])
+        usage[0] += now_cpu - self.last_sample_cpu
+        usage[1] += now_wall - self.last_sample_wall
+        self.last_sample_wall = now_wall
+        self.last_sample_cpu = now_cpu
+        
+        if now_wall - self.last_report_time >= CPU_REPORT_INTERVAL:
+            self.last_report_time = now_wall
+            self.report_cpu_usage()
+    
+    def report_cpu_usage(self):
+        parts = []
+        for state, (cpu_seconds, wall_seconds) in self.cpu_usage.items():
+            if wall_seconds > 0:
+                parts.append(f"{STATE_NAMES.get(state, state)}: {100 * cpu_seconds / wall_seconds:.1f}%")
+        if parts:
+            print("CPU usage - " + ", ".join(parts))
+
+frame_scheduler = FrameScheduler(TARGET_RACING_FPS)
+
+class InputLatencyMonitor:
+    """Histogram of the time from a key event to the first swapped frame that reflects it"""
+    
+    def __init__(self, target_ms=INPUT_LATENCY_TARGET_MS, buckets_ms=INPUT_LATENCY_BUCKETS_MS):
+        self.target_ms = target_ms
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.samples_ms = []
+    
+    def frame_swapped(self, race_session):
+        """Call right after the buffer swap: every input a tick applied since the last swap is now visible"""
+        if not race_session.applied_input_times:
+            return
+        
+        now = time.perf_counter()
+        for timestamp in race_session.applied_input_times:
+            latency_ms = (now - timestamp) * 1000
+            self.samples_ms.append(latency_ms)
+            self.counts[bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+        race_session.applied_input_times.clear()
+    
+    def report(self):
+        if not self.samples_ms:
+            return
+        
+        samples = sorted(self.samples_ms)
+        p95 = percentile(samples, 0.95)
+        print(f"Input latency - {len(samples)} events, p50 {percentile(samples, 0.5):.1f} ms, "
+              f"p95 {p95:.1f} ms, max {samples[-1]:.1f} ms "
+              f"({'within' if p95 <= self.target_ms else 'OVER'} {self.target_ms} ms target at p95)")
+        
+        lower = 0
+        for upper, count in zip(self.buckets_ms + [None], self.counts):
+            label = f"{lower:>3}-{upper:<3} ms" if upper is not None else f"{lower:>3}+     ms"
+            print(f"  {label} {count:6d} {'#' * int(40 * count / len(samples))}")
+            lower = upper
+
+input_latency = InputLatencyMonitor()
+
+class RaceStartTimer:
+    """Time from the key that starts a race to the first racing frame on screen"""
+    
+    def __init__(self, target_ms=RACE_START_TARGET_MS):
+        self.target_ms = target_ms
+        self.started_at = None
+        self.samples_ms = []
+    
+    def start(self):
+        self.started_at = time.perf_counter()
+    
+    def frame_swapped(self, state):
+        if self.started_at is None or state != RACING:
+            return
+        
+        start_ms = (time.perf_counter() - self.started_at) * 1000
+        self.started_at = None
+        self.samples_ms.append(start_ms)
+        print(f"Race start took {start_ms:.1f} ms{' (over target)' if start_ms > self.target_ms else ''}")
+    
+    def report(self):
+        if self.samples_ms:
+            print(f"Race start - {len(self.samples_ms)} starts, max {max(self.samples_ms):.1f} ms "
+                  f"(target {self.target_ms} ms)")
+
+race_start_timer = RaceStartTimer()
 
 def draw_text_2d(x, y, text, size=18):
     """FIXED - Draw 2D text on screen overlay with better error handling"""
@@ -242,277 +1809,262 @@ def draw_text_2d(x, y, text, size=18):
     # Restore OpenGL state
     glPopAttrib()
 
-def draw_coins():
-    """Draw collectible coins on the road"""
-    for coin in coin_positions:
+def box_mesh(size_x, size_y, size_z, center=(0, 0, 0)):
+    """GL_TRIANGLES (vertices, normals) of an axis-aligned box, like a scaled glutSolidCube"""
+    half = (size_x / 2, size_y / 2, size_z / 2)
+    vertices = []
+    normals = []
+    for axis in range(3):
+        u, v = [a for a in range(3) if a != axis]
+        for sign in (-1, 1):
+            normal = [0, 0, 0]
+            normal[axis] = sign
+            corners = []
+            for du, dv in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+                point = [0, 0, 0]
+                point[axis] = sign
+                point[u] = du
+                point[v] = dv
+                corners.append(tuple(center[i] + point[i] * half[i] for i in range(3)))
+            for i in (0, 1, 2, 0, 2, 3):
+                vertices.append(corners[i])
+                normals.append(tuple(normal))
+    return vertices, normals
+
+def cylinder_mesh(base_radius, top_radius, height, slices, offset=(0, 0, 0), lying=False):
+    """Open cylinder along +z like gluCylinder; `lying` turns it onto the y axis (glRotatef(90, 1, 0, 0))"""
+    slope = (base_radius - top_radius) / height
+    vertices = []
+    normals = []
+    for j in range(slices):
+        ring = []
+        for k in (j, j + 1):
+            angle = 2 * math.pi * k / slices
+            c, s = math.cos(angle), math.sin(angle)
+            length = math.sqrt(1 + slope * slope)
+            normal = (c / length, s / length, slope / length)
+            ring.append(((base_radius * c, base_radius * s, 0), (top_radius * c, top_radius * s, height), normal))
+        (b0, t0, n0), (b1, t1, n1) = ring
+        for point, normal in ((b0, n0), (b1, n1), (t1, n1), (b0, n0), (t1, n1), (t0, n0)):
+            vertices.append(point)
+            normals.append(normal)
+    if lying:
+        vertices = [(x, -z, y) for x, y, z in vertices]
+        normals = [(x, -z, y) for x, y, z in normals]
+    ox, oy, oz = offset
+    return [(x + ox, y + oy, z + oz) for x, y, z in vertices], normals
+
+def sphere_mesh(radius, slices, stacks, center=(0, 0, 0)):
+    """GL_TRIANGLES (vertices, normals) of a UV sphere like glutSolidSphere"""
+    cx, cy, cz = center
+    vertices = []
+    normals = []
+    for i in range(stacks):
+        lat_a = math.pi * i / stacks - math.pi / 2
+        lat_b = math.pi * (i + 1) / stacks - math.pi / 2
+        for j in range(slices):
+            lon_a = 2 * math.pi * j / slices
+            lon_b = 2 * math.pi * (j + 1) / slices
+            quad = [(math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+                    for lat, lon in ((lat_a, lon_a), (lat_a, lon_b), (lat_b, lon_b), (lat_b, lon_a))]
+            for k in (0, 1, 2, 0, 2, 3):
+                nx, ny, nz = quad[k]
+                vertices.append((cx + nx * radius, cy + ny * radius, cz + nz * radius))
+                normals.append(quad[k])
+    return vertices, normals
+
+def pack_vertices(vertices):
+    """Float32 bytes of (x, y, z) tuples, ready for glVertexPointer or glNormalPointer"""
+    return array.array('f', [value for vertex in vertices for value in vertex]).tobytes()
+
+def pack_mesh(mesh):
+    vertices, normals = mesh
+    return pack_vertices(vertices), pack_vertices(normals), len(vertices)
+
+def merge_meshes(*meshes):
+    vertices = []
+    normals = []
+    for mesh_vertices, mesh_normals in meshes:
+        vertices += mesh_vertices
+        normals += mesh_normals
+    return vertices, normals
+
+def build_shared_meshes():
+    """Build every mesh once as packed triangle arrays in model space, shared by all its instances"""
+    if mesh_templates:
+        return
+    
+    meshes = {
+        'car_body': box_mesh(35, 20, 10),
+        'car_roof': box_mesh(25, 15, 8, (0, 0, 8)),
+        'car_wheels': merge_meshes(*[cylinder_mesh(5, 5, 4, 10, (wx, wy, wz), lying=True)
+                                     for wx, wy, wz in [(-15, 12, -3), (15, 12, -3), (-15, -12, -3), (15, -12, -3)]]),
+        'headlights_day': merge_meshes(*[sphere_mesh(3, 8, 6, (hx, 18, 3)) for hx in [-12, 12]]),
+        # Bigger headlights at night
+        'headlights_night': merge_meshes(*[sphere_mesh(4, 10, 8, (hx, 18, 3)) for hx in [-12, 12]]),
+        'coin_rim': cylinder_mesh(8, 8, 3, 8),
+        'coin_face': sphere_mesh(6, 8, 6, (0, 0, 1.5)),
+        'tree_trunk': cylinder_mesh(12, 8, 50, 8),
+        'tree_top': sphere_mesh(30, 10, 8, (0, 0, 45))
+    }
+    for name, mesh in meshes.items():
+        mesh_templates[name] = pack_mesh(mesh)
+
+def submit_coins():
+    """Queue collectible coins on the road"""
+    # One spin angle for the whole frame, shared by every coin instance
+    coin_angle = time.time() * 180
+    
+    # Coins glow at night
+    rim_color = (1.2, 1.2, 0.5) if session.is_night_mode else (1, 1, 0)
+    face_color = (1.0, 0.8, 0.2) if session.is_night_mode else (0.8, 0.6, 0)
+    
+    for coin in session.coin_positions:
         if coin[3]:
-            glPushMatrix()
-            glTranslatef(coin[0], coin[1], coin[2])
-            glRotatef(time.time() * 180, 0, 0, 1)
-            
-            # Coins glow at night
-            if is_night_mode:
-                glColor3f(1.2, 1.2, 0.5)  # Brighter gold at night
-            else:
-                glColor3f(1, 1, 0)  # Regular gold
-                
-            gluCylinder(gluNewQuadric(), 8, 8, 3, 8, 1)
-            glTranslatef(0, 0, 1.5)
-            
-            if is_night_mode:
-                glColor3f(1.0, 0.8, 0.2)
-            else:
-                glColor3f(0.8, 0.6, 0)
-                
-            glutSolidSphere(6, 8, 6)
-            glPopMatrix()
+            transform = (coin[0], coin[1], coin[2], coin_angle)
+            render_queue.submit_mesh('coin_rim', rim_color, transform)
+            render_queue.submit_mesh('coin_face', face_color, transform)
 
-def draw_highway_road():
-    """Draw the highway road"""
+def submit_highway_road():
+    """Queue the highway road"""
     # Road surface color based on night mode only
-    if is_night_mode:
-        glColor3f(0.3, 0.3, 0.35)   # Dark road at night
+    road_color = (0.3, 0.3, 0.35) if session.is_night_mode else (0.4, 0.4, 0.4)
+    if session.is_night_mode:
+        submit_lit_surface(road_color, -ROAD_WIDTH/2, ROAD_WIDTH/2, LIT_ROAD_STEPS)
     else:
-        glColor3f(0.4, 0.4, 0.4)    # Regular road
-    
-    glBegin(GL_QUADS)
-    glVertex3f(-ROAD_WIDTH/2, 0, 0)
-    glVertex3f(ROAD_WIDTH/2, 0, 0)
-    glVertex3f(ROAD_WIDTH/2, ROAD_LENGTH, 0)
-    glVertex3f(-ROAD_WIDTH/2, ROAD_LENGTH, 0)
-    glEnd()
+        render_queue.submit_array(GL_QUADS, road_color, session.track.strip(-ROAD_WIDTH/2, ROAD_WIDTH/2, 0))
     
     # Highway boundaries - brighter at night
-    if is_night_mode:
-        glColor3f(1.2, 1.2, 1.2)  # Bright white at night
-    else:
-        glColor3f(1, 1, 1)  # Regular white
-        
-    glLineWidth(5)
-    glBegin(GL_LINES)
-    glVertex3f(-ROAD_WIDTH/2, 0, 1)
-    glVertex3f(-ROAD_WIDTH/2, ROAD_LENGTH, 1)
-    glVertex3f(ROAD_WIDTH/2, 0, 1)
-    glVertex3f(ROAD_WIDTH/2, ROAD_LENGTH, 1)
-    glEnd()
+    boundary_color = (1.2, 1.2, 1.2) if session.is_night_mode else (1, 1, 1)
+    render_queue.submit_array(GL_LINES, boundary_color, session.track.line(-ROAD_WIDTH/2, 1), line_width=5)
+    render_queue.submit_array(GL_LINES, boundary_color, session.track.line(ROAD_WIDTH/2, 1), line_width=5)
     
     # Center dividing line - glows at night
-    if is_night_mode:
-        glColor3f(1.5, 1.5, 0.5)  # Bright yellow at night
-    else:
-        glColor3f(1, 1, 0)  # Regular yellow
-        
-    glLineWidth(3)
-    dash_length = 50
-    gap_length = 30
-    y_pos = 0
-    while y_pos < ROAD_LENGTH:
-        glBegin(GL_LINES)
-        glVertex3f(0, y_pos, 1)
-        glVertex3f(0, min(y_pos + dash_length, ROAD_LENGTH), 1)
-        glEnd()
-        y_pos += dash_length + gap_length
+    divider_color = (1.5, 1.5, 0.5) if session.is_night_mode else (1, 1, 0)
+    render_queue.submit_array(GL_LINES, divider_color, session.track.line(0, 1, dash_length=50, gap_length=30), line_width=3)
     
     # Start line
-    glColor3f(0.5, 1, 0.5) if is_night_mode else glColor3f(0, 1, 0)
-    glLineWidth(8)
-    glBegin(GL_LINES)
-    glVertex3f(-ROAD_WIDTH/2, 50, 2)
-    glVertex3f(ROAD_WIDTH/2, 50, 2)
-    glEnd()
+    start_color = (0.5, 1, 0.5) if session.is_night_mode else (0, 1, 0)
+    render_queue.submit(GL_LINES, start_color, [
+        session.track.vertex_at(50, -ROAD_WIDTH/2, 2), session.track.vertex_at(50, ROAD_WIDTH/2, 2)
+    ], line_width=8)
     
-    draw_coins()
-    draw_finish_line()
+    submit_coins()
+    submit_finish_line()
 
-def draw_finish_line():
-    """Draw finish line with night effects"""
-    finish_y = FINISH_LINE_POSITION
+def submit_finish_line():
+    """Queue finish line with night effects"""
+    finish_s = session.finish_line_position
     
     # Red base line - brighter at night
-    if is_night_mode:
-        glColor3f(1.5, 0.3, 0.3)
-    else:
-        glColor3f(1, 0, 0)
-        
-    glLineWidth(10)
-    glBegin(GL_LINES)
-    glVertex3f(-ROAD_WIDTH/2, finish_y, 2)
-    glVertex3f(ROAD_WIDTH/2, finish_y, 2)
-    glEnd()
+    base_color = (1.5, 0.3, 0.3) if session.is_night_mode else (1, 0, 0)
+    render_queue.submit(GL_LINES, base_color, [
+        session.track.vertex_at(finish_s, -ROAD_WIDTH/2, 2), session.track.vertex_at(finish_s, ROAD_WIDTH/2, 2)
+    ], line_width=10)
     
     # Checkered pattern
-    glColor3f(0.1, 0.1, 0.1) if is_night_mode else glColor3f(0, 0, 0)
+    checker_color = (0.1, 0.1, 0.1) if session.is_night_mode else (0, 0, 0)
     segment_width = ROAD_WIDTH / 12
+    checkers = []
     for i in range(0, 12, 2):
-        x1 = -ROAD_WIDTH/2 + i * segment_width
-        x2 = -ROAD_WIDTH/2 + (i + 1) * segment_width
-        glLineWidth(8)
-        glBegin(GL_LINES)
-        glVertex3f(x1, finish_y, 3)
-        glVertex3f(x2, finish_y, 3)
-        glEnd()
+        checkers.append(session.track.vertex_at(finish_s, -ROAD_WIDTH/2 + i * segment_width, 3))
+        checkers.append(session.track.vertex_at(finish_s, -ROAD_WIDTH/2 + (i + 1) * segment_width, 3))
+    render_queue.submit(GL_LINES, checker_color, checkers, line_width=8)
 
-def draw_highway_environment():
-    """Draw environment with night/day effects"""
+def submit_highway_environment():
+    """Queue environment with night/day effects"""
     # Grass color changes for night
-    if is_night_mode:
-        glColor3f(0.1, 0.3, 0.1)  # Dark grass at night
+    grass_color = (0.1, 0.3, 0.1) if session.is_night_mode else (0.2, 0.7, 0.2)
+    if session.is_night_mode:
+        submit_lit_surface(grass_color, -1000, -ROAD_WIDTH/2, LIT_GRASS_STEPS)  # Left side
+        submit_lit_surface(grass_color, ROAD_WIDTH/2, 1000, LIT_GRASS_STEPS)    # Right side
     else:
-        glColor3f(0.2, 0.7, 0.2)  # Regular grass
-    
-    # Left side
-    glBegin(GL_QUADS)
-    glVertex3f(-1000, 0, 0)
-    glVertex3f(-ROAD_WIDTH/2, 0, 0)
-    glVertex3f(-ROAD_WIDTH/2, ROAD_LENGTH, 0)
-    glVertex3f(-1000, ROAD_LENGTH, 0)
-    glEnd()
-    
-    # Right side
-    glBegin(GL_QUADS)
-    glVertex3f(ROAD_WIDTH/2, 0, 0)
-    glVertex3f(1000, 0, 0)
-    glVertex3f(1000, ROAD_LENGTH, 0)
-    glVertex3f(ROAD_WIDTH/2, ROAD_LENGTH, 0)
-    glEnd()
-    
-    # Trees with night effects
-    tree_positions = [
-        (-250, 300), (280, 500), (-300, 800), (320, 1200),
-        (-280, 1600), (300, 2000), (-320, 2400), (290, 2800)
-    ]
-    
-    for x, y in tree_positions:
-        if y < ROAD_LENGTH:
-            glPushMatrix()
-            glTranslatef(x, y, 0)
-            
-            # Tree trunk - darker at night
-            if is_night_mode:
-                glColor3f(0.2, 0.1, 0)
-            else:
-                glColor3f(0.4, 0.2, 0)
-            gluCylinder(gluNewQuadric(), 12, 8, 50, 8, 1)
-            
-            # Tree top - darker at night
-            glTranslatef(0, 0, 45)
-            if is_night_mode:
-                glColor3f(0.05, 0.3, 0.05)
-            else:
-                glColor3f(0.1, 0.6, 0.1)
-            glutSolidSphere(30, 10, 8)
-            
-            glPopMatrix()
+        render_queue.submit_array(GL_QUADS, grass_color, session.track.strip(-1000, -ROAD_WIDTH/2, 0))  # Left side
+        render_queue.submit_array(GL_QUADS, grass_color, session.track.strip(ROAD_WIDTH/2, 1000, 0))    # Right side
+    
+    # Trees - darker at night
+    trunk_color = (0.2, 0.1, 0) if session.is_night_mode else (0.4, 0.2, 0)
+    leaf_color = (0.05, 0.3, 0.05) if session.is_night_mode else (0.1, 0.6, 0.1)
+    for x, y in session.tree_positions:
+        render_queue.submit_mesh('tree_trunk', trunk_color, (x, y, 0, 0))
+        render_queue.submit_mesh('tree_top', leaf_color, (x, y, 0, 0))
 
-def draw_racing_car(car):
-    """Draw cars with headlights at night"""
-    glPushMatrix()
-    glTranslatef(car.x, car.y, car.z)
-    glRotatef(car.rotation, 0, 0, 1)
-    
-    # Car body
-    if car.crashed:
-        glColor3f(0.5, 0.5, 0.5)
-    else:
-        if is_night_mode:
-            # Slightly brighter colors at night
-            glColor3f(car.color[0] * 1.1, car.color[1] * 1.1, car.color[2] * 1.1)
-        else:
-            glColor3f(*car.color)
-    
-    glPushMatrix()
-    glScalef(35, 20, 10)
-    glutSolidCube(1)
-    glPopMatrix()
-    
-    # Car roof
-    if car.crashed:
-        glColor3f(0.3, 0.3, 0.3)
-    else:
-        roof_brightness = 1.1 if is_night_mode else 0.7
-        glColor3f(car.color[0] * roof_brightness, car.color[1] * roof_brightness, car.color[2] * roof_brightness)
-    
-    glPushMatrix()
-    glTranslatef(0, 0, 8)
-    glScalef(25, 15, 8)
-    glutSolidCube(1)
-    glPopMatrix()
-    
-    # Wheels
-    glColor3f(0.1, 0.1, 0.1)
-    wheel_positions = [(-15, 12, -3), (15, 12, -3), (-15, -12, -3), (15, -12, -3)]
-    for wx, wy, wz in wheel_positions:
-        glPushMatrix()
-        glTranslatef(wx, wy, wz)
-        glRotatef(90, 1, 0, 0)
-        gluCylinder(gluNewQuadric(), 5, 5, 4, 10, 1)
-        glPopMatrix()
-    
-    # Headlights - much brighter at night
-    if car.crashed:
-        glColor3f(0.5, 0.5, 0.4)
-    else:
-        if is_night_mode:
-            glColor3f(1.5, 1.5, 1.0)  # Bright headlights at night
+def submit_lit_surface(color, lateral_a, lateral_b, lateral_steps):
+    """Queue a night surface in chunks: finely tessellated within headlight range, coarse beyond it"""
+    track = session.track
+    player_s = session.player_car.track_s
+    near_start = player_s - HEADLIGHT_RANGE_BEHIND
+    near_end = player_s + HEADLIGHT_RANGE_AHEAD
+    for chunk_start in range(0, int(math.ceil(track.length)), LIT_CHUNK_LENGTH):
+        chunk_end = min(chunk_start + LIT_CHUNK_LENGTH, track.length)
+        if chunk_end >= near_start and chunk_start <= near_end:
+            vertex_array = track.grid(lateral_a, lateral_b, 0, chunk_start, chunk_end, LIT_SEGMENT_LENGTH, lateral_steps)
         else:
-            glColor3f(1, 1, 0.8)  # Regular headlights
-    
-    for hx in [-12, 12]:
-        glPushMatrix()
-        glTranslatef(hx, 18, 3)
-        if is_night_mode:
-            glutSolidSphere(4, 10, 8)  # Bigger headlights at night
+            vertex_array = track.grid(lateral_a, lateral_b, 0, chunk_start, chunk_end, LIT_COARSE_SEGMENT_LENGTH, 1)
+        render_queue.submit_array(GL_QUADS, color, vertex_array)
+
+def warm_road_geometry(track):
+    """Build the cached strips and lines the road and environment passes ask the track for"""
+    track.strip(-ROAD_WIDTH/2, ROAD_WIDTH/2, 0)
+    track.strip(-1000, -ROAD_WIDTH/2, 0)
+    track.strip(ROAD_WIDTH/2, 1000, 0)
+    track.line(-ROAD_WIDTH/2, 1)
+    track.line(ROAD_WIDTH/2, 1)
+    track.line(0, 1, dash_length=50, gap_length=30)
+
+def build_car_instances(cars):
+    """Per-frame instance buffer: transform plus body, roof and headlight colours for each car"""
+    instances = []
+    for car in cars:
+        r, g, b = car.color
+        if car.crashed:
+            body_color = (0.5, 0.5, 0.5)
+            roof_color = (0.3, 0.3, 0.3)
+            light_color = (0.5, 0.5, 0.4)
+        elif session.is_night_mode:
+            # Slightly brighter colors at night
+            body_color = (r * 1.1, g * 1.1, b * 1.1)
+            roof_color = body_color
+            light_color = (1.5, 1.5, 1.0)  # Bright headlights at night
         else:
-            glutSolidSphere(3, 8, 6)
-        glPopMatrix()
-    
-    glPopMatrix()
+            body_color = (r, g, b)
+            roof_color = (r * 0.7, g * 0.7, b * 0.7)
+            light_color = (1, 1, 0.8)  # Regular headlights
+        instances.append(((car.x, car.y, car.z, car.heading + car.rotation), body_color, roof_color, light_color))
+    return instances
 
-def update_ai_racers(dt):
-    """AI with difficulty adjustments and ALL cars update"""
-    for i, car in enumerate(ai_cars):
-        if car.finished or car.crashed:
-            continue
-        
-        # AI speed based on custom difficulty
-        difficulty_multiplier = 0.15 + (custom_difficulty * 0.01)
-        ai_speed_multiplier = difficulty_multiplier + (current_level * 0.01)
-        
-        # Ensure each AI car gets proper acceleration
-        car.velocity_y += car.acceleration_power * ai_speed_multiplier
-        
-        # AI steering logic
-        current_time = time.time()
-        if int(current_time * 2 + i) % 10 == 0:  # Different timing for each AI
-            if abs(car.x) < ROAD_WIDTH/3:
-                steer_direction = 1 if car.x < 0 else -1
-                car.velocity_x += steer_direction * 0.2
-        
-        if abs(car.x) > ROAD_WIDTH/3:
-            car.velocity_x -= car.x * 0.1
-        
-        # Make sure each AI car updates
-        car.update(dt)
+def submit_racing_cars(cars):
+    """Queue cars with headlights at night, one item per shared mesh"""
+    headlight_mesh = 'headlights_night' if session.is_night_mode else 'headlights_day'
+    for transform, body_color, roof_color, light_color in build_car_instances(cars):
+        render_queue.submit_mesh('car_body', body_color, transform)
+        render_queue.submit_mesh('car_roof', roof_color, transform)
+        render_queue.submit_mesh('car_wheels', (0.1, 0.1, 0.1), transform)
+        render_queue.submit_mesh(headlight_mesh, light_color, transform)
 
 def update_highway_camera():
     """Camera system"""
-    if game_state == RACING:
-        if first_person_view:
+    player_car = session.player_car
+    if session.game_state in (RACING, PAUSED, FINISHED):
+        if session.first_person_view:
             glMatrixMode(GL_PROJECTION)
             glLoadIdentity()
             gluPerspective(70, WINDOW_WIDTH/WINDOW_HEIGHT, 1, 5000)
             
             glMatrixMode(GL_MODELVIEW)
             glLoadIdentity()
-            forward_x = math.sin(math.radians(player_car.rotation))
-            forward_y = math.cos(math.radians(player_car.rotation))
+            view_angle = math.radians(player_car.rotation - player_car.heading)
+            forward_x = math.sin(view_angle)
+            forward_y = math.cos(view_angle)
             
             gluLookAt(player_car.x, player_car.y, player_car.z + 20,
                       player_car.x + forward_x * 100, player_car.y + forward_y * 100, player_car.z + 15,
                       0, 0, 1)
         else:
-            target_x = player_car.x
-            target_y = player_car.y - camera_distance
+            # Chase from behind along the track direction
+            forward_x, forward_y = session.track.tangents[player_car.track_segment]
+            target_x = player_car.x - forward_x * camera_distance
+            target_y = player_car.y - forward_y * camera_distance
             target_z = player_car.z + camera_height
             
             glMatrixMode(GL_PROJECTION)
@@ -522,50 +2074,52 @@ def update_highway_camera():
             glMatrixMode(GL_MODELVIEW)
             glLoadIdentity()
             gluLookAt(target_x, target_y, target_z,
-                      player_car.x, player_car.y + 100, player_car.z + 20,
+                      player_car.x + forward_x * 100, player_car.y + forward_y * 100, player_car.z + 20,
                       0, 0, 1)
 
 def draw_dashboard_hud():
     """Enhanced HUD"""
-    if game_state != RACING and game_state != PAUSED:
+    if session.game_state != RACING and session.game_state != PAUSED:
         return
     
-    if player_car.crashed:
+    if session.player_car.crashed:
         draw_text_2d(WINDOW_WIDTH//2 - 50, WINDOW_HEIGHT//2, "CRASHED!")
         return
     
     # Speed display
-    speed_mph = int(player_car.speed * 15)
+    speed_mph = int(session.player_car.speed * 15)
     draw_text_2d(20, WINDOW_HEIGHT - 40, f"Speed: {speed_mph} MPH")
     
     # Lap counter
-    draw_text_2d(20, WINDOW_HEIGHT - 70, f"Lap: {current_lap}/{total_laps}")
+    draw_text_2d(20, WINDOW_HEIGHT - 70, f"Lap: {session.current_lap}/{session.total_laps}")
     
-    draw_text_2d(20, WINDOW_HEIGHT - 100, f"Coins: {coins_collected}")
-    draw_text_2d(20, WINDOW_HEIGHT - 130, f"Level: {current_level}/{max_level}")
+    draw_text_2d(20, WINDOW_HEIGHT - 100, f"Coins: {session.coins_collected}")
+    draw_text_2d(20, WINDOW_HEIGHT - 130, f"Level: {session.current_level}/{max_level}")
     
     # Weather status
-    weather_text = "Night" if is_night_mode else "Day"
+    weather_text = "Night" if session.is_night_mode else "Day"
     draw_text_2d(20, WINDOW_HEIGHT - 160, f"Time: {weather_text}")
     
-    distance_remaining = max(0, FINISH_LINE_POSITION - player_car.y)
+    distance_remaining = max(0, session.finish_line_position - session.player_car.track_s)
     draw_text_2d(20, WINDOW_HEIGHT - 190, f"Distance: {int(distance_remaining)}m")
     
-    if race_start_time > 0:
-        current_race_time = time.time() - race_start_time
-        draw_text_2d(20, WINDOW_HEIGHT - 220, f"Time: {current_race_time:.1f}s")
+    if session.race_clock > 0:
+        draw_text_2d(20, WINDOW_HEIGHT - 220, f"Time: {session.race_clock:.1f}s")
     
     # Position
     position = 1
-    for car in ai_cars:
-        if car.y > player_car.y and not car.crashed:
+    for car in session.ai_cars:
+        if car.track_s > session.player_car.track_s and not car.crashed:
             position += 1
     
     draw_text_2d(20, WINDOW_HEIGHT - 250, f"Position: {position}/4")
     
     # Show AI car count for debugging
-    active_ai = len([car for car in ai_cars if not car.crashed])
+    active_ai = sum(1 for car in session.ai_cars if not car.crashed)
     draw_text_2d(20, WINDOW_HEIGHT - 280, f"AI Cars Active: {active_ai}/3")
+    draw_text_2d(20, WINDOW_HEIGHT - 310, f"Draw Calls: {render_queue.draw_calls}  State Changes: {render_queue.state_changes}", 12)
+    draw_text_2d(20, WINDOW_HEIGHT - 330, f"Physics Substeps: {session.physics_stats['last_tick_substeps']}", 12)
+    draw_text_2d(20, WINDOW_HEIGHT - 350, f"Minimap: {minimap.last_update_ms:.2f} ms at {MINIMAP_UPDATE_HZ} Hz", 12)
     
     # Game title
     draw_text_2d(WINDOW_WIDTH - 200, WINDOW_HEIGHT - 30, "HIGHWAY DASH 3D")
@@ -578,7 +2132,7 @@ def draw_dashboard_hud():
 
 def draw_main_menu():
     """Main menu"""
-    if is_night_mode:
+    if session.is_night_mode:
         glClearColor(0.05, 0.05, 0.15, 1)  # Dark blue night
     else:
         glClearColor(0.1, 0.1, 0.3, 1)     # Regular blue
@@ -588,11 +2142,11 @@ def draw_main_menu():
     draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 120, "Ultimate Highway Racing")
     
     # Weather status
-    weather_status = f"Time: {'Night' if is_night_mode else 'Day'}"
+    weather_status = f"Time: {'Night' if session.is_night_mode else 'Day'}"
     draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 80, weather_status)
     
-    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 50, f"Current Level: {current_level}/{max_level}")
-    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 30, f"Total Coins: {coins_collected}")
+    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 50, f"Current Level: {session.current_level}/{max_level}")
+    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 30, f"Total Coins: {session.coins_collected}")
     
     # Menu options
     draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 - 10, "Press SPACE to Start Race")
@@ -604,7 +2158,7 @@ def draw_main_menu():
 
 def draw_custom_race_menu():
     """Custom race settings menu"""
-    if is_night_mode:
+    if session.is_night_mode:
         glClearColor(0.05, 0.15, 0.05, 1)
     else:
         glClearColor(0.1, 0.3, 0.1, 1)
@@ -613,16 +2167,16 @@ def draw_custom_race_menu():
     draw_text_2d(WINDOW_WIDTH//2 - 130, WINDOW_HEIGHT//2 + 120, "==========================")
     
     # Laps setting
-    draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 60, f"Laps: {custom_laps}")
+    draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 60, f"Laps: {session.custom_laps}")
     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 40, "Press 1/2/3 for 1/3/5 laps")
     
     # Difficulty setting
     difficulties = ["Easy", "Medium", "Hard"]
-    draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2, f"Difficulty: {difficulties[custom_difficulty-1]}")
+    draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2, f"Difficulty: {difficulties[session.custom_difficulty-1]}")
     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 20, "Press Q/W/E for Easy/Med/Hard")
     
     # Time display
-    time_status = f"Time: {'Night' if is_night_mode else 'Day'}"
+    time_status = f"Time: {'Night' if session.is_night_mode else 'Day'}"
     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 80, time_status)
     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 100, "Press N to toggle Night")
     
@@ -633,7 +2187,7 @@ def draw_custom_race_menu():
 def draw_game_complete():
     """FIXED - Game completion screen with working text display"""
     # Set background color
-    if is_night_mode:
+    if session.is_night_mode:
         glClearColor(0.1, 0.4, 0.1, 1)
     else:
         glClearColor(0.2, 0.8, 0.2, 1)
@@ -651,334 +2205,734 @@ def draw_game_complete():
     draw_text_2d(center_x - 80, center_y + 50, "Compete, Win!", 18)
     
     # Game stats
-    draw_text_2d(center_x - 120, center_y + 10, f"Total Coins Collected: {coins_collected}", 18)
-    draw_text_2d(center_x - 100, center_y - 20, f"Total Races Won: {races_won}", 18)
+    draw_text_2d(center_x - 120, center_y + 10, f"Total Coins Collected: {session.coins_collected}", 18)
+    draw_text_2d(center_x - 100, center_y - 20, f"Total Races Won: {session.races_won}", 18)
     
     # Auto-restart notice
-    if game_complete_time is not None:
-        remaining_time = max(0, AUTO_RESTART_SECONDS - (time.time() - game_complete_time))
+    if session.game_complete_time is not None:
+        remaining_time = max(0, AUTO_RESTART_SECONDS - (time.time() - session.game_complete_time))
         draw_text_2d(center_x - 140, center_y - 60, f"Restarting to Level 1 in {remaining_time:.1f} seconds...", 18)
     else:
         draw_text_2d(center_x - 100, center_y - 60, "Thanks for Playing!", 18)
         draw_text_2d(center_x - 130, center_y - 90, "Press ESC to return to menu", 18)
 
-def handle_highway_controls(dt):
-    """Control system"""
-    global first_person_view
-    
-    if game_state != RACING:
-        return
-        
-    if keys[b'w']:
-        player_car.accelerate()
-    if keys[b's']:
-        player_car.brake()
-    if keys[b'a']:
-        player_car.steer_left()
-    if keys[b'd']:
-        player_car.steer_right()
-    
-    if not keys[b'a'] and not keys[b'd']:
-        player_car.center_rotation()
-
-def initialize_race_cars():
-    """Initialize all 4 cars (player + 3 AI) for racing"""
-    # Reset player car
-    player_car.x, player_car.y, player_car.z = 0, 0, 5
-    player_car.velocity_x = player_car.velocity_y = 0
-    player_car.rotation = 0
-    player_car.finished = False
-    player_car.crashed = False
-    player_car.laps_completed = 0
-    player_car.speed = 0
-    
-    # Reset all 3 AI cars with proper starting positions
-    ai_starting_positions = [(-40, 50, 5), (40, 100, 5), (-20, 150, 5)]
-    
-    for i, car in enumerate(ai_cars):
-        if i < len(ai_starting_positions):
-            car.x, car.y, car.z = ai_starting_positions[i]
-        else:
-            car.x, car.y, car.z = random.uniform(-50, 50), random.uniform(50, 200), 5
-        
-        car.velocity_x = car.velocity_y = 0
-        car.rotation = 0
-        car.finished = False
-        car.crashed = False
-        car.laps_completed = 0
-        car.speed = 0
-
 def keyboard_down(key, x, y):
     """Enhanced input handler"""
-    global game_state, race_start_time, first_person_view, current_level, ROAD_LENGTH, FINISH_LINE_POSITION
-    global is_night_mode, custom_laps, custom_difficulty, total_laps, current_lap
+    # Any key press may change what a static screen shows
+    frame_scheduler.request_redraw()
     
     # Night mode toggle (work in any state)
     if key == b'n':
-        is_night_mode = not is_night_mode
-        print(f"Night mode {'ON' if is_night_mode else 'OFF'}")
+        session.is_night_mode = not session.is_night_mode
+        frame_cache.invalidate()
+        print(f"Night mode {'ON' if session.is_night_mode else 'OFF'}")
     
-    if game_state == GAME_COMPLETE:
-        game_state = MENU
+    if session.game_state == GAME_COMPLETE:
+        session.game_state = MENU
         return
     
     # Custom Race Menu controls
-    elif game_state == CUSTOM_RACE_MENU:
+    elif session.game_state == CUSTOM_RACE_MENU:
         if key == b'1':
-            custom_laps = 1
+            session.custom_laps = 1
         elif key == b'2':
-            custom_laps = 3
+            session.custom_laps = 3
         elif key == b'3':
-            custom_laps = 5
+            session.custom_laps = 5
         elif key == b'q':
-            custom_difficulty = 1
+            session.custom_difficulty = 1
         elif key == b'w':
-            custom_difficulty = 2
+            session.custom_difficulty = 2
         elif key == b'e':
-            custom_difficulty = 3
+            session.custom_difficulty = 3
         elif key == b' ':
             # Start custom race with all cars properly initialized
             print("Starting custom race...")
-            total_laps = custom_laps
-            current_lap = 1
-            game_state = RACING
-            race_start_time = time.time()
-            ROAD_LENGTH = 3000 + (current_level * 2000)
-            FINISH_LINE_POSITION = ROAD_LENGTH - 200
-            generate_collectibles()
-            
-            # Use proper initialization function
-            initialize_race_cars()
-            
-            print(f"Custom race started - {total_laps} laps, difficulty {custom_difficulty}")
+            race_start_timer.start()
+            session.start_race(session.custom_laps)
+            print(f"Custom race started - {session.total_laps} laps, difficulty {session.custom_difficulty}")
         elif key == b'\x1b':
-            game_state = MENU
+            session.game_state = MENU
     
     # Regular menu controls
     elif key == b' ':
-        if game_state == MENU:
+        if session.game_state == MENU:
             # Regular race initialization
             print("Starting regular race...")
-            total_laps = 1
-            current_lap = 1
-            game_state = RACING
-            race_start_time = time.time()
-            ROAD_LENGTH = 3000 + (current_level * 2000)
-            FINISH_LINE_POSITION = ROAD_LENGTH - 200
-            generate_collectibles()
-            
-            # Use proper initialization function
-            initialize_race_cars()
-            
+            race_start_timer.start()
+            session.start_race(1)
             print("Regular race started")
-    elif key == b'm' and game_state == MENU:
-        game_state = CUSTOM_RACE_MENU
-    elif key == b'p' and game_state == RACING:
-        game_state = PAUSED
-    elif key == b'p' and game_state == PAUSED:
-        game_state = RACING
-    elif key == b'c' and game_state == RACING:
-        first_person_view = not first_person_view
+    elif key == b'm' and session.game_state == MENU:
+        session.game_state = CUSTOM_RACE_MENU
+    elif key == b'p' and session.game_state == RACING:
+        session.game_state = PAUSED
+    elif key == b'p' and session.game_state == PAUSED:
+        session.game_state = RACING
+    elif key == b'c' and session.game_state == RACING:
+        session.first_person_view = not session.first_person_view
     elif key == b'r':
-        restart_highway_race()
+        race_start_timer.start()
+        print("Restarting race...")
+        session.restart_highway_race()
+        print("Race restarted with all cars")
     elif key == b'\x1b':
-        if game_state == CUSTOM_RACE_MENU:
-            game_state = MENU
-        elif game_state == FINISHED:
-            game_state = MENU
-        elif game_state == GAME_COMPLETE:
-            game_state = MENU
-        elif game_state == MENU:
+        if session.game_state == CUSTOM_RACE_MENU:
+            session.game_state = MENU
+        elif session.game_state == FINISHED:
+            session.game_state = MENU
+        elif session.game_state == GAME_COMPLETE:
+            session.game_state = MENU
+        elif session.game_state == MENU:
+            frame_scheduler.report_cpu_usage()
+            input_latency.report()
+            race_start_timer.report()
+            if alloc_profiler is not None:
+                alloc_profiler.report()
             try:
                 glutLeaveMainLoop()
             except:
-                import sys
                 sys.exit(0)
         else:
-            game_state = MENU
+            session.game_state = MENU
     
-    if key in keys:
-        keys[key] = True
+    # Driving keys are applied by the next simulation tick
+    session.queue_input(key, True)
 
 def keyboard_up(key, x, y):
     """Key release handler"""
-    if key in keys:
-        keys[key] = False
-
-def level_up():
-    """Progress to next level with auto-restart"""
-    global current_level, races_won, game_state, game_complete_time
-    
-    races_won += 1
-    current_level += 1
-    print(f"Level completed! Advanced to level {current_level}")
-    
-    # If we just finished level 5, go to GAME_COMPLETE and start auto-restart timer
-    if current_level > max_level:
-        print("All levels completed GAME_COMPLETE")
-        game_state = GAME_COMPLETE
-        game_complete_time = time.time()
-        # Clamp level display at max
-        current_level = max_level
-        return
+    session.queue_input(key, False)
 
-def restart_highway_race():
-    """Restart race with all AI cars"""
-    global game_state, race_start_time, coins_collected, current_lap
-    
-    print("Restarting race...")
-    current_lap = 1
+def draw_highway_scene():
+    """Full 3D pass: sky, environment, road, coins and cars"""
+    # Background color changes for night mode
+    if session.is_night_mode:
+        glClearColor(0.1, 0.1, 0.2, 1)  # Dark night sky
+    else:
+        glClearColor(0.6, 0.8, 1.0, 1)  # Bright day sky
     
-    # Use proper initialization function
-    initialize_race_cars()
+    update_highway_camera()
+    headlights.apply(session)
     
-    generate_collectibles()
+    glEnable(GL_DEPTH_TEST)
+    render_queue.begin_frame()
+    submit_highway_environment()
+    submit_highway_road()
     
-    game_state = RACING
-    race_start_time = time.time()
+    if session.first_person_view:
+        submit_racing_cars(session.ai_cars)
+    else:
+        # Draw all 4 cars (player + 3 AI)
+        submit_racing_cars(session.all_cars)
     
-    print("Race restarted with all cars")
-
-def reset_to_new_game():
-    """Reset to new game (Level 1)"""
-    global current_level, races_won, coins_collected, game_state
-    print("Resetting to new game (Level 1)")
-    current_level = 1
-    races_won = 0
-    coins_collected = 0
-    # Recompute track metrics for level 1
-    global ROAD_LENGTH, FINISH_LINE_POSITION
-    ROAD_LENGTH = 3000 + (current_level * 2000)
-    FINISH_LINE_POSITION = ROAD_LENGTH - 200
-    game_state = MENU
+    render_queue.flush()
+    glDisable(GL_DEPTH_TEST)
 
-def update_highway_game(dt):
-    """Main update loop"""
-    global game_state
-    
-    if game_state == RACING:
-        handle_highway_controls(dt)
-        
-        # Car collision detection
-        for i, car1 in enumerate(all_cars):
-            if car1.crashed:
-                continue
-            for j, car2 in enumerate(all_cars):
-                if i >= j or car2.crashed:
-                    continue
-                if detect_car_collision(car1, car2):
-                    car1.crashed = True
-                    car2.crashed = True
-                    if car1.is_player or car2.is_player:
-                        game_state = FINISHED
-                        return
-        
-        # Update player and ALL AI cars
-        player_car.update(dt)
-        update_ai_racers(dt)  # This updates all 3 AI cars
-        
-        if player_car.finished:
-            player_won = True
-            for car in ai_cars:
-                if car.finished and not car.crashed and car.race_time < player_car.race_time:
-                    player_won = False
-                    break
-            
-            if player_won:
-                print(f"Player won Current level: {current_level}")
-                level_up()
-                print(f"After level_up, game state: {game_state}")
-            
-            game_state = FINISHED
+def draw_cached_highway_scene():
+    """Static screens reuse the last 3D frame, rendering and capturing it only when the cache is stale"""
+    if frame_cache.valid:
+        frame_cache.draw()
+    else:
+        draw_highway_scene()
+        frame_cache.capture()
 
 def display():
     """Main display function"""
+    profile_stage('draw')
+    if session.game_state == RACING:
+        # Low rate offscreen pass, drawn before the clear so the frame paints over it
+        minimap.update_if_due(session)
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     
-    if game_state == MENU:
+    if session.game_state == MENU:
         draw_main_menu()
-    elif game_state == CUSTOM_RACE_MENU:
+    elif session.game_state == CUSTOM_RACE_MENU:
         draw_custom_race_menu()
-    elif game_state == GAME_COMPLETE:
+    elif session.game_state == GAME_COMPLETE:
         draw_game_complete()
-    elif game_state == RACING or game_state == PAUSED:
-        # Background color changes for night mode
-        if is_night_mode:
-            glClearColor(0.1, 0.1, 0.2, 1)  # Dark night sky
-        else:
-            glClearColor(0.6, 0.8, 1.0, 1)  # Bright day sky
-        
-        update_highway_camera()
-        
-        glEnable(GL_DEPTH_TEST)
-        draw_highway_environment()
-        draw_highway_road()
-        
-        if first_person_view:
-            for car in ai_cars:
-                draw_racing_car(car)
-        else:
-            # Draw all 4 cars (player + 3 AI)
-            for car in all_cars:
-                draw_racing_car(car)
-        
-        glDisable(GL_DEPTH_TEST)
-        
+    elif session.game_state == RACING:
+        draw_highway_scene()
+        frame_cache.invalidate()  # The scene moved on, the next pause captures a fresh frame
+        profile_stage('hud')
         draw_dashboard_hud()
-        
-        if game_state == PAUSED:
-            draw_text_2d(WINDOW_WIDTH//2 - 50, WINDOW_HEIGHT//2, "PAUSED")
+        minimap.draw()
     
-    elif game_state == FINISHED:
-        if player_car.crashed:
+    elif session.game_state == PAUSED:
+        draw_cached_highway_scene()
+        profile_stage('hud')
+        draw_dashboard_hud()
+        minimap.draw()
+        draw_text_2d(WINDOW_WIDTH//2 - 50, WINDOW_HEIGHT//2, "PAUSED")
+    
+    elif session.game_state == FINISHED:
+        draw_cached_highway_scene()
+        profile_stage('hud')
+        
+        if session.player_car.crashed:
             draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 60, "RACE OVER - CRASHED!")
             draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 30, "You collided with another car!")
         else:
-            player_won = True
-            for car in ai_cars:
-                if car.finished and not car.crashed and car.race_time < player_car.race_time:
-                    player_won = False
-                    break
-            
-            if player_won:
-                if current_level >= max_level:
+            if session.player_won():
+                if session.current_level >= max_level:
                     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 60, "GAME COMPLETE")
                     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 30, "All levels finished")
                     draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 + 5, "Compete, Win")
                 else:
                     draw_text_2d(WINDOW_WIDTH//2 - 60, WINDOW_HEIGHT//2 + 60, "LEVEL COMPLETED")
-                    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 30, f"Advancing to Level {current_level}!")
-                draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 20, f"Coins Earned: {len([c for c in coin_positions if not c[3]])}")
+                    draw_text_2d(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 + 30, f"Advancing to Level {session.current_level}!")
+                draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 20, f"Coins Earned: {sum(1 for c in session.coin_positions if not c[3])}")
             else:
                 draw_text_2d(WINDOW_WIDTH//2 - 60, WINDOW_HEIGHT//2 + 30, "RACE FINISHED")
         
-        if player_car.finished:
-            draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 50, f"Your Time: {player_car.race_time:.2f}s")
+        if session.player_car.finished:
+            draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 50, f"Your Time: {session.player_car.race_time:.2f}s")
         
         draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 80, "Press R to restart")
         draw_text_2d(WINDOW_WIDTH//2 - 80, WINDOW_HEIGHT//2 - 110, "Press ESC for menu")
     
+    profile_stage('swap')
     glutSwapBuffers()
+    input_latency.frame_swapped(session)
+    race_start_timer.frame_swapped(session.game_state)
+    
+    profile_stage(None)
+    if alloc_profiler is not None:
+        alloc_profiler.end_frame()
+
+def reshape(width, height):
+    """Window resize: keep the viewport full window and drop the cached frame"""
+    glViewport(0, 0, width, max(1, height))
+    frame_cache.resize(width, max(1, height))
+    frame_scheduler.request_redraw()
+
+def announce_progress(race_session, previous_state, previous_level, previous_wins):
+    """Console messages for level ups and resets the last tick made on the displayed session
+    
+    Sessions don't print themselves, so headless ones (RaceHost, the training env) stay quiet.
+    """
+    if race_session.races_won > previous_wins:
+        print(f"Player won Current level: {previous_level}")
+        print(f"Level completed! Advanced to level {previous_level + 1}")
+        if race_session.current_level == previous_level:
+            # level_up clamps the level once the last one is won
+            print("All levels completed GAME_COMPLETE")
+    elif previous_state == GAME_COMPLETE and race_session.game_state == MENU:
+        print("Resetting to new game (Level 1)")
 
 def idle():
     """Highway Dash 3D timing system with auto-restart"""
-    global last_time, game_complete_time
+    global last_time
+    
+    # Pace before the tick, so the frame it posts shows state no older than this call
+    frame_scheduler.wait_for_next_frame(session.game_state)
+    frame_scheduler.record_cpu_usage(session.game_state)
     
     current_time = time.time()
     dt = min(current_time - last_time, 0.1)
     last_time = current_time
     
-    # Handle auto-restart when in GAME_COMPLETE
-    if game_state == GAME_COMPLETE and game_complete_time is not None:
-        if (current_time - game_complete_time) >= AUTO_RESTART_SECONDS:
-            reset_to_new_game()
+    profile_stage('simulation')
+    previous_state, previous_level, previous_wins = session.game_state, session.current_level, session.races_won
+    session.advance(dt)
+    profile_stage(None)
+    announce_progress(session, previous_state, previous_level, previous_wins)
+    
+    # Result and menu screens leave the main thread idle, so build the next level meanwhile
+    if session.game_state in (MENU, CUSTOM_RACE_MENU, FINISHED, GAME_COMPLETE):
+        session.prepare_next_level()
     
-    update_highway_game(dt)
-    glutPostRedisplay()
+    # Static screens (menus, paused, finished) only redraw when something changed
+    if frame_scheduler.should_redraw(session):
+        glutPostRedisplay()
+
+class HighwayRaceVectorEnv:
+    """N independent headless races stepped together (Gym vector env style API)
+    
+    Each env is a RaceSession on the level's shared track, and all of them keep their cars in
+    one CarBatch, so a step is one simulate_races call whose physics passes cover every car of
+    every race. The agent drives the player car through the same controls as the keyboard and
+    everything else is the game's own simulation, so agents train against exactly the opponents
+    the game has. Actions are (accelerate, brake, steer_left, steer_right) flags per env.
+    """
+    
+    def __init__(self, num_envs, level=1, difficulty=1, seed=None, max_steps=ENV_MAX_STEPS):
+        self.num_envs = num_envs
+        self.level = level
+        self.difficulty = difficulty
+        self.max_steps = max_steps
+        self.rng = random.Random(seed)
+        
+        self.car_batch = CarBatch()
+        self.sessions = [RaceSession(level, car_batch=self.car_batch) for _ in range(num_envs)]
+        self.steps = [0] * num_envs
+        
+        self.single_observation_size = ENV_OBSERVATION_SIZE
+        self.single_action_size = 4
+        if spaces is not None:
+            self.single_observation_space = spaces.Box(-math.inf, math.inf, (ENV_OBSERVATION_SIZE,))
+            self.single_action_space = spaces.MultiBinary(4)
+    
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        for env in range(self.num_envs):
+            self.reset_env(env)
+        return [self.observe(env) for env in range(self.num_envs)], {}
+    
+    def reset_env(self, env):
+        """Start a fresh race in one slot, laid out the same way the game starts one"""
+        race = self.sessions[env]
+        race.rng.seed(self.rng.getrandbits(32))
+        race.current_level = self.level
+        race.custom_difficulty = self.difficulty
+        race.coins_collected = 0
+        for key in race.keys:
+            race.keys[key] = False
+        race.start_race(1)
+        self.steps[env] = 0
+    
+    def observe(self, env):
+        """Own state, nearby cars and the next coins, all in track space relative to the agent"""
+        race = self.sessions[env]
+        batch = self.car_batch
+        velocity_x, velocity_y, track_s, track_offset = batch.velocity_x, batch.velocity_y, batch.track_s, batch.track_offset
+        agent = race.player_car.slot
+        agent_s = track_s[agent]
+        agent_offset = track_offset[agent]
+        forward_x, forward_y = race.track.tangents[batch.track_segment[agent]]
+        agent_forward = velocity_x[agent] * forward_x + velocity_y[agent] * forward_y
+        
+        observation = [
+            agent_s / race.finish_line_position,
+            agent_offset / (ROAD_WIDTH / 2),
+            agent_forward,
+            velocity_x[agent] * forward_y - velocity_y[agent] * forward_x
+        ]
+        
+        # Other cars, closest along the track first
+        others = []
+        for car in race.ai_cars:
+            other = car.slot
+            other_forward = velocity_x[other] * forward_x + velocity_y[other] * forward_y
+            others.append((abs(track_s[other] - agent_s), track_s[other] - agent_s,
+                           track_offset[other] - agent_offset, other_forward - agent_forward,
+                           1.0 if batch.crashed[other] else 0.0))
+        others.sort()
+        for car in others:
+            observation.extend(car[1:])
+        
+        # Next active coins ahead, padded with far away placeholders
+        found = 0
+        for coin in race.coin_positions[bisect.bisect_left(race.coin_distances, agent_s):]:
+            if found == ENV_COINS_AHEAD:
+                break
+            if coin[3]:
+                observation.extend((coin[4] - agent_s, coin[5] - agent_offset))
+                found += 1
+        for _ in range(ENV_COINS_AHEAD - found):
+            observation.extend((race.track.length, 0.0))
+        return observation
+    
+    def step(self, actions):
+        """Advance every race by one ENV_DT tick together; finished races reset automatically"""
+        start_s = []
+        start_coins = []
+        for race, (accelerate, brake, steer_left, steer_right) in zip(self.sessions, actions):
+            keys = race.keys
+            keys[b'w'] = bool(accelerate)
+            keys[b's'] = bool(brake)
+            keys[b'a'] = bool(steer_left)
+            keys[b'd'] = bool(steer_right)
+            start_s.append(race.player_car.track_s)
+            start_coins.append(race.coins_collected)
+        
+        simulate_races(self.sessions, ENV_DT)
+        
+        observations, rewards, terminated, truncated, infos = [], [], [], [], []
+        for env in range(self.num_envs):
+            race = self.sessions[env]
+            agent = race.player_car
+            self.steps[env] += 1
+            
+            reward = (agent.track_s - start_s[env]) * ENV_PROGRESS_REWARD
+            reward += (race.coins_collected - start_coins[env]) * ENV_COIN_REWARD
+            done = False
+            won = False
+            if agent.crashed:
+                reward += ENV_CRASH_REWARD
+                done = True
+            elif agent.finished:
+                won = race.player_won()
+                reward += ENV_WIN_REWARD if won else ENV_FINISH_REWARD
+                done = True
+            timed_out = not done and self.steps[env] >= self.max_steps
+            
+            observation = self.observe(env)
+            info = {}
+            if done or timed_out:
+                info = {"final_observation": observation, "coins": race.coins_collected,
+                        "steps": self.steps[env], "won": won}
+                self.reset_env(env)
+                observation = self.observe(env)
+            
+            observations.append(observation)
+            rewards.append(reward)
+            terminated.append(done)
+            truncated.append(timed_out)
+            infos.append(info)
+        
+        return observations, rewards, terminated, truncated, infos
+
+class HighwayRaceEnv:
+    """Single race Gym style environment, a one-slot HighwayRaceVectorEnv"""
+    
+    def __init__(self, level=1, difficulty=1, seed=None, max_steps=ENV_MAX_STEPS):
+        self.vector_env = HighwayRaceVectorEnv(1, level, difficulty, seed, max_steps)
+        if spaces is not None:
+            self.observation_space = self.vector_env.single_observation_space
+            self.action_space = self.vector_env.single_action_space
+    
+    def reset(self, seed=None):
+        observations, info = self.vector_env.reset(seed)
+        return observations[0], info
+    
+    def step(self, action):
+        observations, rewards, terminated, truncated, infos = self.vector_env.step([action])
+        return observations[0], rewards[0], terminated[0], truncated[0], infos[0]
+
+def benchmark_env_throughput(num_envs=ENV_BENCHMARK_ENVS, steps=ENV_BENCHMARK_STEPS, seed=0):
+    """Measure vector env steps per second on one CPU with random driving"""
+    env = HighwayRaceVectorEnv(num_envs, seed=seed)
+    env.reset()
+    rng = random.Random(seed)
+    action_sets = [[(True, rng.random() < 0.05, rng.random() < 0.2, rng.random() < 0.2)
+                    for _ in range(num_envs)] for _ in range(16)]
+    
+    start = time.perf_counter()
+    for step in range(steps):
+        env.step(action_sets[step % len(action_sets)])
+    elapsed = time.perf_counter() - start
+    
+    result = {
+        "num_envs": num_envs,
+        "steps": steps,
+        "seconds": round(elapsed, 3),
+        "env_steps_per_second": round(num_envs * steps / elapsed, 1)
+    }
+    print(json.dumps(result))
+    return result
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = int(math.ceil(fraction * len(sorted_values))) - 1
+    return sorted_values[max(0, min(index, len(sorted_values) - 1))]
+
+class RenderBenchmark:
+    """Scripted camera flythrough that times every frame of the 3D pass"""
+    
+    def __init__(self, output_path=None):
+        self.output_path = output_path
+        self.segment_index = 0
+        self.frame = 0
+        self.frame_times = []
+        self.draw_calls = []
+        self.state_changes = []
+        self.headlights = []
+        self.results = []
+    
+    def setup(self):
+        """Fixed level, seed and car layout so runs are comparable across machines"""
+        global session
+        
+        session = RaceSession(BENCHMARK_LEVEL, BENCHMARK_SEED)
+        session.start_race(1)
+        self.start_segment()
+    
+    def start_segment(self):
+        name, first_person, night = BENCHMARK_SEGMENTS[self.segment_index]
+        session.first_person_view = first_person
+        session.is_night_mode = night
+        self.frame = 0
+        self.frame_times = []
+        self.draw_calls = []
+        self.state_changes = []
+        self.headlights = []
+    
+    def place_cars(self):
+        """Move the player along the scripted path with the AI cars just ahead"""
+        progress = self.frame / BENCHMARK_FRAMES_PER_SEGMENT
+        distance = 50 + progress * (session.finish_line_position - 100)
+        weave = math.sin(progress * math.pi * 6)
+        
+        session.player_car.place_on_track(distance, weave * 100)
+        session.player_car.rotation = weave * 15
+        for i, car in enumerate(session.ai_cars):
+            car.place_on_track(distance + 150 * (i + 1), (i - 1) * 80)
+        session.occupancy.rebuild(session.all_cars)  # No simulation ticks here, so index the cars ourselves
+    
+    def step(self):
+        """Idle callback: render and time one benchmark frame"""
+        self.place_cars()
+        
+        frame_start = time.perf_counter()
+        display()  # Runs update_highway_camera and the full 3D pass
+        glFinish()
+        self.frame_times.append((time.perf_counter() - frame_start) * 1000)
+        self.draw_calls.append(render_queue.draw_calls)
+        self.state_changes.append(render_queue.state_changes)
+        self.headlights.append(headlights.active)
+        
+        self.frame += 1
+        if self.frame < BENCHMARK_FRAMES_PER_SEGMENT:
+            return
+        
+        self.finish_segment()
+        self.segment_index += 1
+        if self.segment_index < len(BENCHMARK_SEGMENTS):
+            self.start_segment()
+        else:
+            self.report()
+            try:
+                glutLeaveMainLoop()
+            except:
+                sys.exit(0)
+    
+    def finish_segment(self):
+        name, first_person, night = BENCHMARK_SEGMENTS[self.segment_index]
+        times = sorted(self.frame_times)
+        self.results.append({
+            "segment": name,
+            "first_person": first_person,
+            "night": night,
+            "frames": len(times),
+            "frame_ms_min": round(times[0], 3),
+            "frame_ms_avg": round(sum(times) / len(times), 3),
+            "frame_ms_p95": round(percentile(times, 0.95), 3),
+            "frame_ms_p99": round(percentile(times, 0.99), 3),
+            "draw_calls_avg": round(sum(self.draw_calls) / len(self.draw_calls), 1),
+            "draw_calls_max": max(self.draw_calls),
+            "state_changes_avg": round(sum(self.state_changes) / len(self.state_changes), 1),
+            "headlights_avg": round(sum(self.headlights) / len(self.headlights), 1)
+        })
+    
+    def night_impact(self):
+        """Average frame time change from turning night mode (and its headlights) on, per view"""
+        averages = {(result["first_person"], result["night"]): result["frame_ms_avg"] for result in self.results}
+        impact = {}
+        for first_person in (False, True):
+            day = averages.get((first_person, False))
+            night = averages.get((first_person, True))
+            if day is not None and night is not None:
+                impact["first_person" if first_person else "chase"] = {
+                    "day_ms_avg": day,
+                    "night_ms_avg": night,
+                    "delta_ms": round(night - day, 3),
+                    "delta_percent": round(100 * (night - day) / day, 1) if day > 0 else None
+                }
+        return impact
+    
+    def report(self):
+        """Print the results as one JSON document, and write them to a file if asked"""
+        renderer = glGetString(GL_RENDERER)
+        report = {
+            "level": BENCHMARK_LEVEL,
+            "seed": BENCHMARK_SEED,
+            "window": [WINDOW_WIDTH, WINDOW_HEIGHT],
+            "renderer": renderer.decode() if isinstance(renderer, bytes) else str(renderer),
+            "segments": self.results,
+            "night_impact": self.night_impact()
+        }
+        print(json.dumps(report, indent=2))
+        if self.output_path:
+            with open(self.output_path, "w") as output:
+                json.dump(report, output, indent=2)
+
+def resident_memory_kb():
+    """Process RSS in KB, which also sees native allocations tracemalloc can't (None where unavailable)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class AllocationProfiler:
+    """Per frame stage allocation figures from tracemalloc, plus retained growth over time
+    
+    A stage's peak is the most memory it held above its starting point (its temporaries),
+    its retained bytes are what was still allocated when it ended.
+    """
+    
+    def __init__(self, report_frames=ALLOC_REPORT_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.report_frames = report_frames
+        self.frames = 0
+        self.stage_name = None
+        self.stage_start = 0
+        self.stages = {}  # name -> [summed peak bytes, summed retained bytes]
+        self.reset_baseline()
+    
+    def reset_baseline(self):
+        """Measure retained growth from now on"""
+        self.frames = 0
+        self.stages = {}
+        self.baseline_traced = tracemalloc.get_traced_memory()[0]
+        self.baseline_rss = resident_memory_kb()
+    
+    def stage(self, name):
+        """End the running stage and start charging allocations to `name` (None to just end it)"""
+        if self.stage_name is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            totals = self.stages.setdefault(self.stage_name, [0, 0])
+            totals[0] += peak - self.stage_start
+            totals[1] += current - self.stage_start
+        
+        self.stage_name = name
+        if name is not None:
+            tracemalloc.reset_peak()
+            self.stage_start = tracemalloc.get_traced_memory()[0]
+    
+    def end_frame(self):
+        self.frames += 1
+        if self.frames % self.report_frames == 0:
+            self.report()
+    
+    def growth_kb(self):
+        """(traced Python growth, RSS growth or None) since the baseline"""
+        traced = (tracemalloc.get_traced_memory()[0] - self.baseline_traced) / 1024
+        rss = resident_memory_kb()
+        if rss is None or self.baseline_rss is None:
+            return traced, None
+        return traced, rss - self.baseline_rss
+    
+    def report(self):
+        if not self.frames:
+            return
+        
+        parts = []
+        for name, (peak, retained) in self.stages.items():
+            parts.append(f"{name} {peak / self.frames / 1024:.1f} KB peak, {retained / self.frames:+.0f} B kept")
+        print(f"Allocations per frame ({self.frames} frames) - " + ", ".join(parts))
+        
+        traced, rss = self.growth_kb()
+        rss_text = f"{rss:+d} KB" if rss is not None else "n/a"
+        print(f"Retained growth - traced {traced:+.1f} KB, RSS {rss_text}")
+
+# Set by --alloc-profile; every profile_stage call is a no-op without it
+alloc_profiler = None
+
+def profile_stage(name):
+    """Charge allocations from here on to a frame stage, None ends the current one"""
+    if alloc_profiler is not None:
+        alloc_profiler.stage(name)
+
+def run_soak_test(frames=SOAK_TEST_FRAMES):
+    """Headless soak: simulate and queue the 3D pass for many frames, fail if memory keeps growing
+    
+    Runs without a window, so it covers everything up to the GL calls: simulation, render queue
+    submission and draw ordering, track and lit surface arrays, and headlight selection, with
+    night mode switched on and off along the way. Returns True when both growth budgets held.
+    """
+    global session, alloc_profiler
+    # Trace from before the first track and the meshes are built, so they aren't counted as growth
+    alloc_profiler = AllocationProfiler(report_frames=max(1, frames // 5))
+    build_shared_meshes()
+    session = RaceSession(BENCHMARK_LEVEL, BENCHMARK_SEED)
+    session.start_race(1)
+    baseline_snapshot = None
+    
+    # Warm up over at least one whole race at night, so every lit surface chunk the track caches
+    # exists before the baseline; after it night mode flips every SOAK_NIGHT_TOGGLE_FRAMES
+    frame = 0
+    measured = None  # Frames since the baseline
+    races_ended = 0
+    while measured is None or measured < frames:
+        if measured is None and frame >= SOAK_WARMUP_FRAMES and races_ended:
+            alloc_profiler.reset_baseline()
+            baseline_snapshot = tracemalloc.take_snapshot()
+            measured = 0
+        
+        # Scripted driver: full throttle, weaving every couple of seconds
+        phase = (frame // 120) % 4
+        session.keys[b'w'] = True
+        session.keys[b'a'] = phase == 1
+        session.keys[b'd'] = phase == 3
+        session.is_night_mode = measured is None or (measured // SOAK_NIGHT_TOGGLE_FRAMES) % 2 == 1
+        
+        profile_stage('simulation')
+        session.advance(1.0 / TARGET_RACING_FPS)
+        if session.game_state != RACING:
+            # Stay on the same level so every race has the same footprint
+            races_ended += 1
+            session.current_level = BENCHMARK_LEVEL
+            session.start_race(1)
+        
+        profile_stage('draw')
+        render_queue.begin_frame()
+        submit_highway_environment()
+        submit_highway_road()
+        submit_racing_cars(session.all_cars)
+        render_queue.prepare()
+        if session.is_night_mode:
+            headlights.select(session)
+        profile_stage(None)
+        alloc_profiler.end_frame()
+        
+        frame += 1
+        if measured is not None:
+            measured += 1
+    
+    traced, rss = alloc_profiler.growth_kb()
+    passed = traced <= SOAK_MEMORY_BUDGET_KB and (rss is None or rss <= SOAK_RSS_BUDGET_KB)
+    print(f"Soak test {'PASSED' if passed else 'FAILED'} - {frames} frames, traced growth {traced:+.1f} KB "
+          f"(budget {SOAK_MEMORY_BUDGET_KB} KB), RSS growth {rss if rss is not None else 'n/a'} KB "
+          f"(budget {SOAK_RSS_BUDGET_KB} KB)")
+    if not passed:
+        print("Largest growth since the baseline:")
+        for stat in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[:10]:
+            print(f"  {stat}")
+    return passed
 
 def main():
-    """Initialize Highway Dash 3D"""
-    generate_collectibles()
+    """Initialize Highway Dash 3D
+    
+    `--benchmark [--benchmark-output FILE]` runs the scripted render benchmark instead of the game.
+    On a headless box run it under Xvfb (e.g. `xvfb-run -a`). It uses whatever GL driver is active
+    and records the renderer string in its report.
+    `--software-gl` asks Mesa for its software rasterizer (llvmpipe), e.g. to compare machines on equal terms.
+    `--env-benchmark` measures training environment throughput without opening a window.
+    `--host-benchmark` ticks many headless race sessions in one process and reports tick rate.
+    `--alloc-profile` traces allocations per frame stage while playing and reports them periodically.
+    `--soak-test [FRAMES]` runs a headless memory soak and exits non-zero if growth is over budget.
+    """
+    global alloc_profiler
+    if "--env-benchmark" in sys.argv:
+        benchmark_env_throughput()
+        return
+    if "--host-benchmark" in sys.argv:
+        benchmark_race_host()
+        return
+    if "--soak-test" in sys.argv:
+        index = sys.argv.index("--soak-test") + 1
+        frames = int(sys.argv[index]) if index < len(sys.argv) and sys.argv[index].isdigit() else SOAK_TEST_FRAMES
+        sys.exit(0 if run_soak_test(frames) else 1)
+    if "--alloc-profile" in sys.argv:
+        alloc_profiler = AllocationProfiler()
+    
+    benchmark = None
+    if "--benchmark" in sys.argv:
+        output_path = None
+        if "--benchmark-output" in sys.argv:
+            index = sys.argv.index("--benchmark-output") + 1
+            if index >= len(sys.argv) or sys.argv[index].startswith("--"):
+                print("usage: --benchmark [--benchmark-output FILE]: --benchmark-output needs a file path",
+                      file=sys.stderr)
+                sys.exit(2)
+            output_path = sys.argv[index]
+        benchmark = RenderBenchmark(output_path)
+    if "--software-gl" in sys.argv:
+        os.environ["LIBGL_ALWAYS_SOFTWARE"] = "1"
+    
+    session.generate_collectibles()
     
     glutInit()
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
@@ -990,13 +2944,24 @@ def main():
     glEnable(GL_LIGHT0)
     glLightfv(GL_LIGHT0, GL_POSITION, [100, 100, 200, 1])
     glEnable(GL_COLOR_MATERIAL)
+    headlights.setup()
+    
+    build_shared_meshes()
     
     glutDisplayFunc(display)
+    glutReshapeFunc(reshape)
     glutKeyboardFunc(keyboard_down)
     try:
         glutKeyboardUpFunc(keyboard_up)
     except:
         pass
+    
+    if benchmark is not None:
+        benchmark.setup()
+        glutIdleFunc(benchmark.step)
+        glutMainLoop()
+        return
+    
     glutIdleFunc(idle)
     print("HIGHWAY DASH 3D")
     glutMainLoop()